@@ -1,6 +1,10 @@
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import AsyncGenerator
 from dotenv import load_dotenv
-from groq import Groq
+from groq import Groq, AsyncGroq
 
 # Load environment variables from .env (must be at top)
 load_dotenv()
@@ -11,7 +15,29 @@ if not API_KEY:
 
 client = Groq(api_key=API_KEY)
 
+# Exact-match response cache keyed by a digest of the full prompt (LRU eviction)
+CACHE_SIZE = 1024
+_response_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(full_prompt: str) -> bytes:
+    return hashlib.blake2b(full_prompt.encode(), digest_size=16).digest()
+
+
+def new_async_client() -> AsyncGroq:
+    """Create an async client; its connection pool is bound to the event loop it runs on"""
+    return AsyncGroq(api_key=API_KEY)
+
+
 def call_llm(full_prompt: str) -> str:
+    key = _cache_key(full_prompt)
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            _response_cache.move_to_end(key)
+            return cached
+
     response = client.chat.completions.create(
         model="llama3-70b-8192",
         messages=[
@@ -20,14 +46,61 @@ def call_llm(full_prompt: str) -> str:
         ],
         temperature=0.3
     )
+    content = response.choices[0].message.content
+
+    _cache_store(key, content)
+    return content
+
+
+async def stream_llm_async(full_prompt: str, async_client: AsyncGroq) -> AsyncGenerator[str, None]:
+    """Stream response chunks; closing the generator early aborts the request"""
+    key = _cache_key(full_prompt)
+    with _cache_lock:
+        cached = _response_cache.get(key)
+        if cached is not None:
+            _response_cache.move_to_end(key)
+    if cached is not None:
+        yield cached
+        return
+
+    stream = await async_client.chat.completions.create(
+        model="llama3-70b-8192",
+        messages=[
+            {"role": "system", "content": "You are a helpful emergency assistant."},
+            {"role": "user", "content": full_prompt}
+        ],
+        temperature=0.3,
+        stream=True
+    )
+    parts = []
+    try:
+        async for chunk in stream:
+            content = chunk.choices[0].delta.content
+            if content:
+                parts.append(content)
+                yield content
+    finally:
+        await stream.close()
+    # Only fully received responses are cached; callers that stop reading
+    # early store what they kept with cache_response
+    _cache_store(key, "".join(parts))
+
+
+def cache_response(full_prompt: str, content: str):
+    """Cache a complete response taken from a stream that was closed early"""
+    _cache_store(_cache_key(full_prompt), content)
+
+
+def _cache_store(key: bytes, content: str):
+    with _cache_lock:
+        _response_cache[key] = content
+        if len(_response_cache) > CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
 
-    return response.choices[0].message.content
 if __name__ == "__main__":
     # Example usage
-    messages = [
-        {"role": "system", "content": "You are a helpful assistant."},
-        {"role": "user", "content": "What is the weather like today?"}
-    ]
-    
-    response = call_llm(messages)
+    prompt = "What is the weather like today?"
+
+    response = call_llm(prompt)
     print("LLM Response:", response)  # Print the LLM's response content
\ No newline at end of file
@@ -1,38 +1,9 @@
 import sqlite3
 
-def create_tables():
+def setup_database():
     conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
-
-    # Ambulance table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS ambulances (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            driver_name TEXT,
-            latitude REAL,
-            longitude REAL,
-            is_available INTEGER
-        )
-    """)
-
-    # Bookings table
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS bookings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_latitude REAL,
-            user_longitude REAL,
-            ambulance_id INTEGER,
-            status TEXT
-        )
-    """)
-
-   
-    conn.commit()
-    conn.close()
-
-def populate_dummy_ambulances():
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
 
     ambulances = [
         ("Alice", 12.9330, 77.6100, 1),
@@ -41,16 +12,74 @@ def populate_dummy_ambulances():
         ("David", 12.9400, 77.6200, 1)
     ]
 
-    c.executemany("""
-        INSERT INTO ambulances (driver_name, latitude, longitude, is_available)
-        VALUES (?, ?, ?, ?)
-    """, ambulances)
+    # Tables and seed data go in a single transaction
+    with conn:
+        c = conn.cursor()
+
+        # Ambulance table
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS ambulances (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                driver_name TEXT,
+                latitude REAL,
+                longitude REAL,
+                is_available INTEGER
+            )
+        """)
+
+        # Bookings table
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS bookings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_latitude REAL,
+                user_longitude REAL,
+                ambulance_id INTEGER,
+                status TEXT
+            )
+        """)
+
+        # Nearest-available lookups filter on availability first
+        c.execute("CREATE INDEX IF NOT EXISTS idx_amb_avail ON ambulances(is_available)")
+
+        # Spatial index over ambulance positions (points, so min == max)
+        c.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS ambulance_rtree
+            USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+        """)
+
+        # Mirror positions of ambulances added before the R-Tree existed
+        c.execute("""
+            INSERT OR REPLACE INTO ambulance_rtree (id, min_lat, max_lat, min_lon, max_lon)
+            SELECT id, latitude, latitude, longitude, longitude FROM ambulances
+        """)
+
+        # Keep the R-Tree in step with every later insert, move and delete
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS ambulances_rtree_insert AFTER INSERT ON ambulances BEGIN
+                INSERT INTO ambulance_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+            END
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS ambulances_rtree_update AFTER UPDATE OF latitude, longitude ON ambulances BEGIN
+                UPDATE ambulance_rtree
+                SET min_lat = new.latitude, max_lat = new.latitude, min_lon = new.longitude, max_lon = new.longitude
+                WHERE id = new.id;
+            END
+        """)
+        c.execute("""
+            CREATE TRIGGER IF NOT EXISTS ambulances_rtree_delete AFTER DELETE ON ambulances BEGIN
+                DELETE FROM ambulance_rtree WHERE id = old.id;
+            END
+        """)
+
+        c.executemany("""
+            INSERT INTO ambulances (driver_name, latitude, longitude, is_available)
+            VALUES (?, ?, ?, ?)
+        """, ambulances)
 
-    conn.commit()
     conn.close()
 
 
 if __name__ == "__main__":
-    create_tables()
-    populate_dummy_ambulances()
+    setup_database()
     print("Database, tables created, and dummy data populated.")
@@ -1,21 +1,56 @@
 import re
 import sys
 import os
+import json
+import ast
+import asyncio
+import inspect
+from dataclasses import dataclass, fields
+from functools import lru_cache
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import pcre2  # optional: JIT-compiled regex engine
+except ImportError:
+    pcre2 = None
+
+try:
+    import orjson  # optional: faster JSON encode/decode
+except ImportError:
+    orjson = None
+
 from tools.tools_definations import TOOL_REGISTRY
-from connect_LLM import call_llm
-
-# Initial states
-business_state = {
-    "ambulance_booked": False,
-}
-execution_state = {
-    "user_lat": None,
-    "user_lon": None,
-    "ambulance_id": None,
-    "ETA": None
-}
+from connect_LLM import cache_response, new_async_client, stream_llm_async
+
+@dataclass(slots=True)
+class AgentState:
+    # Business state
+    ambulance_booked: bool = False
+    # Execution state
+    user_lat: Optional[float] = None
+    user_lon: Optional[float] = None
+    ambulance_id: Optional[int] = None
+    ETA: Optional[int] = None
+
+    def business(self) -> Dict[str, Any]:
+        return {"ambulance_booked": self.ambulance_booked}
+
+    def execution(self) -> Dict[str, Any]:
+        return {
+            "user_lat": self.user_lat,
+            "user_lon": self.user_lon,
+            "ambulance_id": self.ambulance_id,
+            "ETA": self.ETA
+        }
+
+
+STATE_FIELDS = frozenset(f.name for f in fields(AgentState))
+# Accepted update keys (exact and normalized spellings) -> field name
+STATE_KEYS = {**{name.lower(): name for name in STATE_FIELDS}, **{name: name for name in STATE_FIELDS}}
+
+# Maximum number of conversations talking to the LLM at once in run_batch
+BATCH_CONCURRENCY = 8
 
 # Prompt template
 SYSTEM_PROMPT = """
@@ -47,88 +82,235 @@ USER_MESSAGE: Your ambulance is on the way and will arrive in 3 minutes. Please
 """
 
 
-THOUGHT_RE = re.compile(r"THOUGHT:\s*(.*)")
-ACTION_RE = re.compile(r"ACTION:\s*(.*)")
-PARAMS_RE = re.compile(r"PARAMS:\s*(\{.*?\})")
-STATE_UPDATE_RE = re.compile(r"STATE_UPDATE:\s*(\{.*?\})")
-USER_MESSAGE_RE = re.compile(r"USER_MESSAGE:\s*(.*)")
+# Flat name -> callable map so the loop does not index into registry entries
+_TOOL_FN = {k: v["function"] for k, v in TOOL_REGISTRY.items()}
 
 
+# One alternation per field so the whole response is scanned in a single pass
+FIELDS_PATTERN = (
+    r"THOUGHT:\s*(?P<thought>.*)"
+    r"|ACTION:\s*(?P<action>.*)"
+    r"|PARAMS:\s*(?P<params>\{.*?\})"
+    r"|STATE_UPDATE:\s*(?P<state_update>\{.*?\})"
+    r"|USER_MESSAGE:\s*(?P<user_message>.*)"
+)
+FIELDS_RE = pcre2.compile(FIELDS_PATTERN, jit=True) if pcre2 else re.compile(FIELDS_PATTERN)
+_NON_SPACE_RE = re.compile(r"\S")
+
+
+@lru_cache(maxsize=1)
 def render_system_prompt():
-    tool_descriptions = "\n".join(
-        [f"- {k}: {v['description']} (inputs: {', '.join(v.get('inputs', []))})" for k, v in TOOL_REGISTRY.items()]
-    )
-    return SYSTEM_PROMPT.format(tools=tool_descriptions, tool_names=", ".join(TOOL_REGISTRY))
+    # TOOL_REGISTRY is static, so the rendered prompt is built once per process
+    descs = []
+    names = []
+    for k, v in TOOL_REGISTRY.items():
+        descs.append(f"- {k}: {v['description']} (inputs: {', '.join(v.get('inputs', ()))})")
+        names.append(k)
+    return SYSTEM_PROMPT.format(tools="\n".join(descs), tool_names=", ".join(names))
+
+
+def parse_dict(text: str) -> Dict[str, Any]:
+    # LLM output is usually JSON, but occasionally uses Python-style single quotes
+    try:
+        return orjson.loads(text) if orjson else json.loads(text)
+    except ValueError:
+        return ast.literal_eval(text)
+
+
+# Labels in the order the prompt asks the LLM to emit them
+FIELD_ORDER = (
+    ("THOUGHT:", "thought"),
+    ("ACTION:", "action"),
+    ("PARAMS:", "params"),
+    ("STATE_UPDATE:", "state_update"),
+    ("USER_MESSAGE:", "user_message"),
+)
+
+
+def _parse_fast(response: str):
+    # Well-formed responses are one field per line in a fixed order, so they
+    # can be sliced with str.find; anything unusual returns None
+    fields = {}
+    pos = 0
+    for label, name in FIELD_ORDER:
+        i = response.find(label, pos)
+        if i == -1:
+            return None
+        i += len(label)
+        j = response.find("\n", i)
+        if j == -1:
+            j = len(response)
+        value = response[i:j].strip()
+        if not value:
+            return None
+        fields[name] = value
+        pos = j
+    if not (fields["params"][0] == "{" and fields["params"][-1] == "}"
+            and fields["state_update"][0] == "{" and fields["state_update"][-1] == "}"):
+        return None
+    return fields
 
 
 def parse_response(response: str) -> Tuple[str, str, Dict[str, Any], Dict[str, Any], str]:
-    thought = THOUGHT_RE.search(response).group(1).strip() if THOUGHT_RE.search(response) else ""
-    action = ACTION_RE.search(response).group(1).strip() if ACTION_RE.search(response) else ""
-    params = eval(PARAMS_RE.search(response).group(1)) if PARAMS_RE.search(response) else {}
-    state_update = eval(STATE_UPDATE_RE.search(response).group(1)) if STATE_UPDATE_RE.search(response) else {}
-    user_message = USER_MESSAGE_RE.search(response).group(1).strip() if USER_MESSAGE_RE.search(response) else ""
+    fields = _parse_fast(response)
+    if fields is None:
+        fields = {}
+        for m in FIELDS_RE.finditer(response):
+            # Keep the first occurrence of each field
+            fields.setdefault(m.lastgroup, m.group(m.lastgroup))
+    thought = fields.get("thought", "").strip()
+    # Interned so registry lookups and comparisons hit the identity fast path
+    action = sys.intern(fields.get("action", "").strip())
+    params = parse_dict(fields["params"]) if "params" in fields else {}
+    state_update = parse_dict(fields["state_update"]) if "state_update" in fields else {}
+    user_message = fields.get("user_message", "").strip()
     return thought, action, params, state_update, user_message
 
 
-def apply_state_update(update: Dict[str, Any]):
+def dump_state(state: Dict[str, Any]) -> str:
+    # Compact JSON matches the format the LLM is asked to answer in
+    if orjson:
+        return orjson.dumps(state).decode()
+    return json.dumps(state, separators=(",", ":"))
+
+
+def response_complete(response: str) -> bool:
+    """True once every field is present and the USER_MESSAGE text has ended"""
+    i = response.find("USER_MESSAGE:")
+    if i == -1:
+        return False
+    # The message may start on the line after the label, so wait for its
+    # first non-whitespace character before looking for the closing newline
+    m = _NON_SPACE_RE.search(response, i + len("USER_MESSAGE:"))
+    return (
+        m is not None
+        and response.find("\n", m.start()) != -1
+        and "ACTION:" in response
+        and "PARAMS:" in response
+        and "STATE_UPDATE:" in response
+    )
+
+
+def apply_state_update(state: AgentState, update: Dict[str, Any]):
     for k, v in update.items():
-        key = k.lower().replace(" ", "_")
-        if key in business_state:
-            business_state[key] = v
-        if key in execution_state:
-            execution_state[key] = v
+        # Keys usually arrive already normalized; only rewrite them on a miss
+        key = STATE_KEYS.get(k)
+        if key is None:
+            key = STATE_KEYS.get(k.lower().replace(" ", "_"))
+        if key is not None:
+            setattr(state, key, v)
 
 
-def run_agent(user_message: str, conversation=None):
+async def run_agent_async(user_message: str, conversation=None, state: Optional[AgentState] = None, llm_client=None):
     # conversation: list of (sender, message) tuples
+    # state: carried across calls by the caller; a fresh one is used if omitted
+    # llm_client: async LLM client for the running loop; one is opened if omitted
+    if llm_client is None:
+        async with new_async_client() as llm_client:
+            return await run_agent_async(user_message, conversation, state, llm_client)
+    if state is None:
+        state = AgentState()
     chat_turns = []
     if conversation is None:
         conversation = [("user", user_message)]
     else:
         chat_turns = conversation.copy()
 
-    # Build conversation string for LLM
-    conversation_str = "\n".join([
+    # Conversation lines for the LLM, joined only when a prompt is built
+    conversation_chunks = [
         ("User: " if sender == "user" else "Agent: ") + msg for sender, msg in conversation
-    ])
+    ]
+
+    prompt_head = render_system_prompt() + "\n\nConversation so far:\n"
 
     while True:
-        prompt = render_system_prompt()
-        full_prompt = f"{prompt}\n\nConversation so far:\n{conversation_str}\n\nCurrent State:\nBusiness: {business_state}\nExecution: {execution_state}"
+        conversation_str = "\n".join(conversation_chunks)
+        full_prompt = f"{prompt_head}{conversation_str}\n\nCurrent State:\nBusiness: {dump_state(state.business())}\nExecution: {dump_state(state.execution())}"
 
-        # Call the LLM
-        response = call_llm(full_prompt)
+        # Stream the LLM response and stop as soon as all fields are in
+        response = ""
+        stopped_early = False
+        chunks = stream_llm_async(full_prompt, llm_client)
+        try:
+            async for chunk in chunks:
+                response += chunk
+                if response_complete(response):
+                    stopped_early = True
+                    break
+        finally:
+            await chunks.aclose()
+        # Closing the stream early skips its own cache write, so store the
+        # complete response here
+        if stopped_early:
+            cache_response(full_prompt, response)
 
         # Parse
         thought, action, params, state_update, user_message_out = parse_response(response)
 
-        apply_state_update(state_update)
+        apply_state_update(state, state_update)
 
         if user_message_out:
             chat_turns.append(("agent", user_message_out))
-            conversation_str += f"\nAgent: {user_message_out}"
+            conversation_chunks.append("Agent: " + user_message_out)
 
         if action == "inform_user":
             break
 
-        if action not in TOOL_REGISTRY:
+        tool_func = _TOOL_FN.get(action)
+        if tool_func is None:
             chat_turns.append(("agent", f"Unknown tool: {action}"))
             break
 
-        tool_func = TOOL_REGISTRY[action]["function"]
-        result = tool_func(**params)
+        # Blocking tools (sqlite lookups) run in a worker thread so other
+        # conversations on the event loop keep making progress
+        if inspect.iscoroutinefunction(tool_func):
+            result = await tool_func(**params)
+        else:
+            result = await asyncio.to_thread(tool_func, **params)
 
         # If the tool result is a user-facing update, show it (optional, fallback)
         if action == "estimate_eta_km" and not user_message_out:
             chat_turns.append(("agent", f"Your ambulance is arriving in {result} minutes."))
-            conversation_str += f"\nAgent: Your ambulance is arriving in {result} minutes."
+            conversation_chunks.append(f"Agent: Your ambulance is arriving in {result} minutes.")
             break
 
         # Add the tool result as the next user message (if needed)
-        conversation_str += f"\nUser: {result}"
+        conversation_chunks.append(f"User: {result}")
 
     return chat_turns
 
 
+def run_agent(user_message: str, conversation=None, state: Optional[AgentState] = None):
+    return asyncio.run(run_agent_async(user_message, conversation, state))
+
+
+async def run_batch_async(messages: List[str], concurrency: int = BATCH_CONCURRENCY) -> List[List[Tuple[str, str]]]:
+    """
+    Run one agent conversation per incoming message concurrently.
+
+    Args:
+        messages: Opening user messages, one per incident
+        concurrency: Maximum number of conversations in flight at once
+
+    Returns:
+        List of chat turns, in the same order as messages
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # One client per event loop, shared by every conversation in the batch
+    async with new_async_client() as llm_client:
+        async def run_one(message: str):
+            async with semaphore:
+                return await run_agent_async(message, llm_client=llm_client)
+
+        # One conversation per message: identical texts can still be separate
+        # incidents, each needing its own bookings and dispatches
+        return list(await asyncio.gather(*(run_one(m) for m in messages)))
+
+
+def run_batch(messages: List[str], concurrency: int = BATCH_CONCURRENCY) -> List[List[Tuple[str, str]]]:
+    return asyncio.run(run_batch_async(messages, concurrency))
+
+
 if __name__ == "__main__":
     run_agent("I need an ambulance at my location")
\ No newline at end of file
@@ -1,11 +1,13 @@
 import streamlit as st
-from agent import run_agent
+from agent import run_agent, AgentState
 
 st.set_page_config(page_title="Emergency Contact Agent", page_icon="🚑")
 st.title("Emergency Contact Agent")
 
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+if "agent_state" not in st.session_state:
+    st.session_state.agent_state = AgentState()
 
 
 user_input = st.chat_input("Type your emergency or question...")
@@ -13,7 +15,7 @@ user_input = st.chat_input("Type your emergency or question...")
 if user_input:
     conversation = st.session_state.chat_history + [("user", user_input)]
     with st.spinner("Agent is responding..."):
-        chat_turns = run_agent(user_input, conversation)
+        chat_turns = run_agent(user_input, conversation, st.session_state.agent_state)
     for sender, msg in chat_turns[len(st.session_state.chat_history):]:
         st.session_state.chat_history.append((sender, msg))
 
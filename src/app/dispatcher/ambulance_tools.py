@@ -3,41 +3,65 @@ Ambulance Tools Module
 Tools for ambulance dispatch, retrieval, and management
 """
 
-import sqlite3
-import math
+import re
 from typing import Optional, List, Dict, Any
-from datetime import datetime
 import os
+import threading
+import numpy as np
+
+from .geo import (
+    haversine_km,
+    origin_terms,
+    haversine_from_origin,
+    bounding_box,
+    equirect_candidates,
+    within_radius,
+)
+from .db import get_connection, db_version
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "../../../database/ambulance.db")
 
+# get_nearest_ambulance starts with a small R-Tree window and doubles it
+# until an ambulance is found or the maximum search radius is reached
+NEAREST_START_RADIUS_KM = 2.0
+NEAREST_MAX_RADIUS_KM = 50.0
+
+_local = threading.local()
+
+CRITICAL_SYMPTOMS = (
+    'chest pain', 'heart attack', 'stroke', 'severe bleeding',
+    'not breathing', 'unconscious', 'seizure', 'severe burn',
+    'head injury', 'spinal injury', 'drowning', 'poisoning'
+)
+
+MODERATE_SYMPTOMS = (
+    'broken bone', 'fracture', 'deep cut', 'difficulty breathing',
+    'allergic reaction', 'high fever', 'severe pain', 'fainting'
+)
+
+# One alternation per severity so each check is a single scan of the symptoms
+CRITICAL_SYMPTOMS_RE = re.compile("|".join(map(re.escape, CRITICAL_SYMPTOMS)))
+MODERATE_SYMPTOMS_RE = re.compile("|".join(map(re.escape, MODERATE_SYMPTOMS)))
+
 def get_db_connection():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's database connection (opened once, then reused)"""
+    return get_connection(DATABASE_PATH)
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate distance between two coordinates using Haversine formula
     Returns distance in kilometers
     """
-    R = 6371  # Earth's radius in kilometers
-    
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    
-    return R * c
+    return haversine_km(lat1, lon1, lat2, lon2)
 
 def estimate_arrival_time(distance_km: float, avg_speed_kmh: float = 40) -> int:
     """Estimate arrival time in minutes based on distance"""
     return max(1, int((distance_km / avg_speed_kmh) * 60))
 
+def estimate_arrival_times(distances_km: np.ndarray, avg_speed_kmh: float = 40) -> np.ndarray:
+    """Vectorized estimate_arrival_time over an array of distances"""
+    return np.maximum(1, ((distances_km / avg_speed_kmh) * 60).astype(np.int64))
+
 # ============== TOOL FUNCTIONS FOR LLM ==============
 
 def get_all_ambulances() -> Dict[str, Any]:
@@ -50,13 +74,17 @@ def get_all_ambulances() -> Dict[str, Any]:
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples; dicts are built below
         cursor.execute("""
             SELECT id, vehicle_number, station_name, latitude, longitude, 
                    status, ambulance_type, contact_number
             FROM ambulances
         """)
-        ambulances = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        ambulances = [
+            {'id': r[0], 'vehicle_number': r[1], 'station_name': r[2], 'latitude': r[3],
+             'longitude': r[4], 'status': r[5], 'ambulance_type': r[6], 'contact_number': r[7]}
+            for r in cursor.fetchall()
+        ]
         
         return {
             "success": True,
@@ -75,15 +103,30 @@ def get_available_ambulances() -> Dict[str, Any]:
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, vehicle_number, station_name, latitude, longitude, 
-                   ambulance_type, contact_number
-            FROM ambulances
-            WHERE status = 'available'
-        """)
-        ambulances = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        
+        # Reuse this thread's last snapshot while the database is unchanged
+        version = db_version(conn)
+        cached = getattr(_local, "available", None)
+        if cached is not None and cached[0] == version:
+            rows = cached[1]
+        else:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # plain tuples; dicts are built below
+            cursor.execute("""
+                SELECT id, vehicle_number, station_name, latitude, longitude, 
+                       ambulance_type, contact_number
+                FROM ambulances
+                WHERE status = 'available'
+                ORDER BY id
+            """)
+            rows = cursor.fetchall()
+            _local.available = (version, rows)
+        
+        ambulances = [
+            {'id': r[0], 'vehicle_number': r[1], 'station_name': r[2], 'latitude': r[3],
+             'longitude': r[4], 'ambulance_type': r[5], 'contact_number': r[6]}
+            for r in rows
+        ]
         
         return {
             "success": True,
@@ -93,6 +136,55 @@ def get_available_ambulances() -> Dict[str, Any]:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _fetch_available(cursor, ambulance_type: Optional[str], box: Optional[tuple]) -> list:
+    """Fetch available ambulances, restricted to a lat/lon box through the R-Tree when given"""
+    if box:
+        query = """
+            SELECT a.id, a.vehicle_number, a.station_name, a.latitude, a.longitude, 
+                   a.ambulance_type, a.contact_number
+            FROM ambulance_rtree r
+            JOIN ambulances a ON a.id = r.id
+            WHERE a.status = 'available'
+              AND r.max_lat >= ? AND r.min_lat <= ?
+              AND r.max_lon >= ? AND r.min_lon <= ?
+        """
+        params = list(box)
+    else:
+        query = """
+            SELECT a.id, a.vehicle_number, a.station_name, a.latitude, a.longitude, 
+                   a.ambulance_type, a.contact_number
+            FROM ambulances a
+            WHERE a.status = 'available'
+        """
+        params = []
+    
+    if ambulance_type:
+        query += " AND a.ambulance_type = ?"
+        params.append(ambulance_type)
+    
+    cursor.row_factory = None  # plain tuples, in the column order above
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def _row_coords(rows: list) -> tuple:
+    """Latitude and longitude arrays for fetched ambulance rows"""
+    lats = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+    lons = np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows))
+    return lats, lons
+
+def _nearby_entry(row: tuple, distance: float, eta_minutes: int) -> Dict[str, Any]:
+    """Result dict for a fetched ambulance row at the given distance"""
+    return {
+        'id': row[0], 'vehicle_number': row[1], 'station_name': row[2], 'latitude': row[3],
+        'longitude': row[4], 'ambulance_type': row[5], 'contact_number': row[6],
+        'distance_km': round(distance, 2),
+        'estimated_arrival_minutes': eta_minutes
+    }
+
+def _row_distances(origin: tuple, rows: list) -> np.ndarray:
+    """Distances in kilometers from a precomputed origin to each fetched ambulance row"""
+    return haversine_from_origin(*origin, *_row_coords(rows))
+
 def get_nearby_ambulances(
     user_lat: float, 
     user_lon: float, 
@@ -115,34 +207,21 @@ def get_nearby_ambulances(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        query = """
-            SELECT id, vehicle_number, station_name, latitude, longitude, 
-                   ambulance_type, contact_number
-            FROM ambulances
-            WHERE status = 'available'
-        """
-        params = []
-        
-        if ambulance_type:
-            query += " AND ambulance_type = ?"
-            params.append(ambulance_type)
+        # Only rows inside the search box reach the Haversine step
+        ambulances = _fetch_available(cursor, ambulance_type, bounding_box(user_lat, user_lon, radius_km))
+        lats, lons = _row_coords(ambulances)
         
-        cursor.execute(query, params)
-        ambulances = cursor.fetchall()
-        conn.close()
+        # Cheap equirectangular reject, then the exact Haversine on survivors
+        candidates = equirect_candidates(user_lat, user_lon, radius_km, lats, lons)
+        distances = haversine_from_origin(*origin_terms(user_lat, user_lon), lats[candidates], lons[candidates])
         
-        # Calculate distances and filter by radius
-        nearby = []
-        for amb in ambulances:
-            distance = calculate_distance(user_lat, user_lon, amb['latitude'], amb['longitude'])
-            if distance <= radius_km:
-                amb_dict = dict(amb)
-                amb_dict['distance_km'] = round(distance, 2)
-                amb_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
-                nearby.append(amb_dict)
-        
-        # Sort by distance
-        nearby.sort(key=lambda x: x['distance_km'])
+        # Indices of rows inside the radius, nearest first
+        order = within_radius(distances, radius_km)
+        etas = estimate_arrival_times(distances[order])
+        nearby = [
+            _nearby_entry(ambulances[candidates[j]], float(distances[j]), int(eta))
+            for j, eta in zip(order, etas)
+        ]
         
         return {
             "success": True,
@@ -170,25 +249,67 @@ def get_nearest_ambulance(
     Returns:
         Dict containing the nearest ambulance details with distance and ETA
     """
-    result = get_nearby_ambulances(user_lat, user_lon, radius_km=50, ambulance_type=ambulance_type)
-    
-    if not result["success"]:
-        return result
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        origin = origin_terms(user_lat, user_lon)
+        nearest = None
+        radius_km = NEAREST_START_RADIUS_KM
+        while True:
+            candidates = _fetch_available(cursor, ambulance_type, bounding_box(user_lat, user_lon, radius_km))
+            if candidates:
+                distances = _row_distances(origin, candidates)
+                # Anything outside the box is farther than radius_km, so the
+                # closest candidate within radius_km is the true nearest.
+                # Only the winner gets a result dict; nothing is sorted.
+                i = int(np.argmin(distances))
+                if distances[i] <= radius_km:
+                    distance = float(distances[i])
+                    nearest = _nearby_entry(candidates[i], distance, estimate_arrival_time(distance))
+                    break
+            
+            if radius_km >= NEAREST_MAX_RADIUS_KM:
+                break
+            radius_km = min(radius_km * 2, NEAREST_MAX_RADIUS_KM)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
     
-    if result["count"] == 0:
+    if nearest is None:
         return {
             "success": False,
             "error": "No available ambulances found nearby",
             "suggestion": "Try expanding search or contact emergency services directly"
         }
     
-    nearest = result["ambulances"][0]
     return {
         "success": True,
         "ambulance": nearest,
         "message": f"Nearest ambulance is {nearest['distance_km']} km away, ETA: {nearest['estimated_arrival_minutes']} minutes"
     }
 
+def _dispatch_confirmation(dispatch_id: int, ambulance, user_lat: float, user_lon: float, distance: float,
+                           emergency_type: str, patient_count: int) -> Dict[str, Any]:
+    """Confirmation returned for one dispatched ambulance"""
+    eta_minutes = estimate_arrival_time(distance)
+    return {
+        "success": True,
+        "dispatch_id": dispatch_id,
+        "ambulance": {
+            "id": ambulance['id'],
+            "vehicle_number": ambulance['vehicle_number'],
+            "station_name": ambulance['station_name'],
+            "type": ambulance['ambulance_type'],
+            "contact": ambulance['contact_number']
+        },
+        "destination": {"latitude": user_lat, "longitude": user_lon},
+        "distance_km": round(distance, 2),
+        "estimated_arrival_minutes": eta_minutes,
+        "emergency_type": emergency_type,
+        "patient_count": patient_count,
+        "message": f"Ambulance {ambulance['vehicle_number']} dispatched. ETA: {eta_minutes} minutes"
+    }
+
 def dispatch_ambulance(
     ambulance_id: int,
     user_lat: float,
@@ -213,55 +334,41 @@ def dispatch_ambulance(
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check if ambulance is available
-        cursor.execute("SELECT * FROM ambulances WHERE id = ?", (ambulance_id,))
-        ambulance = cursor.fetchone()
+        # Check, claim and record the dispatch in one transaction
+        with conn:
+            # Check if ambulance is available
+            ambulance = conn.execute("""
+                SELECT id, vehicle_number, station_name, latitude, longitude,
+                       status, ambulance_type, contact_number
+                FROM ambulances WHERE id = ?
+            """, (ambulance_id,)).fetchone()
         
-        if not ambulance:
-            conn.close()
-            return {"success": False, "error": "Ambulance not found"}
+            if not ambulance:
+                return {"success": False, "error": "Ambulance not found"}
         
-        if ambulance['status'] != 'available':
-            conn.close()
-            return {"success": False, "error": f"Ambulance is currently {ambulance['status']}"}
+            if ambulance['status'] != 'available':
+                return {"success": False, "error": f"Ambulance is currently {ambulance['status']}"}
         
-        # Calculate ETA
-        distance = calculate_distance(user_lat, user_lon, ambulance['latitude'], ambulance['longitude'])
-        eta_minutes = estimate_arrival_time(distance)
+            # Update ambulance status; the status guard keeps a concurrent
+            # dispatch from claiming the same ambulance twice
+            claimed = conn.execute(
+                "UPDATE ambulances SET status = 'dispatched' WHERE id = ? AND status = 'available'",
+                (ambulance_id,)
+            ).rowcount
+            if not claimed:
+                return {"success": False, "error": "Ambulance is currently dispatched"}
         
-        # Update ambulance status
-        cursor.execute("UPDATE ambulances SET status = 'dispatched' WHERE id = ?", (ambulance_id,))
-        
-        # Create dispatch record
-        cursor.execute("""
-            INSERT INTO ambulance_dispatches 
-            (ambulance_id, user_location_lat, user_location_lon, emergency_type, patient_count, notes, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'dispatched')
-        """, (ambulance_id, user_lat, user_lon, emergency_type, patient_count, notes))
+            distance = calculate_distance(user_lat, user_lon, ambulance['latitude'], ambulance['longitude'])
         
-        dispatch_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            # Create dispatch record
+            dispatch_id = conn.execute("""
+                INSERT INTO ambulance_dispatches 
+                (ambulance_id, user_location_lat, user_location_lon, emergency_type, patient_count, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?, 'dispatched')
+            """, (ambulance_id, user_lat, user_lon, emergency_type, patient_count, notes)).lastrowid
         
-        return {
-            "success": True,
-            "dispatch_id": dispatch_id,
-            "ambulance": {
-                "id": ambulance['id'],
-                "vehicle_number": ambulance['vehicle_number'],
-                "station_name": ambulance['station_name'],
-                "type": ambulance['ambulance_type'],
-                "contact": ambulance['contact_number']
-            },
-            "destination": {"latitude": user_lat, "longitude": user_lon},
-            "distance_km": round(distance, 2),
-            "estimated_arrival_minutes": eta_minutes,
-            "emergency_type": emergency_type,
-            "patient_count": patient_count,
-            "message": f"Ambulance {ambulance['vehicle_number']} dispatched. ETA: {eta_minutes} minutes"
-        }
+        return _dispatch_confirmation(dispatch_id, ambulance, user_lat, user_lon, distance,
+                                      emergency_type, patient_count)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -287,21 +394,52 @@ def dispatch_nearest_ambulance(
     Returns:
         Dict containing dispatch confirmation
     """
-    # Find nearest ambulance
-    nearest_result = get_nearest_ambulance(user_lat, user_lon, ambulance_type)
-    
-    if not nearest_result["success"]:
-        return nearest_result
-    
-    # Dispatch it
-    return dispatch_ambulance(
-        ambulance_id=nearest_result["ambulance"]["id"],
-        user_lat=user_lat,
-        user_lon=user_lon,
-        emergency_type=emergency_type,
-        patient_count=patient_count,
-        notes=notes
-    )
+    try:
+        conn = get_db_connection()
+        box = bounding_box(user_lat, user_lon, NEAREST_MAX_RADIUS_KM)
+        in_box = """
+            AND id IN (SELECT id FROM ambulance_rtree
+                       WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)
+        """ if box else ""
+        
+        # Find and claim the nearest available ambulance in one statement, so
+        # no other dispatch can take it between the lookup and the update
+        with conn:
+            ambulance = conn.execute(f"""
+                UPDATE ambulances SET status = 'dispatched'
+                WHERE id = (
+                    SELECT id FROM ambulances
+                    WHERE status = 'available'
+                      AND (? IS NULL OR ambulance_type = ?)
+                      {in_box}
+                      AND haversine_km(?, ?, latitude, longitude) <= ?
+                    ORDER BY haversine_km(?, ?, latitude, longitude), id
+                    LIMIT 1
+                )
+                RETURNING id, vehicle_number, station_name, latitude, longitude,
+                          ambulance_type, contact_number
+            """, (ambulance_type or None, ambulance_type or None, *(box or ()),
+                  user_lat, user_lon, NEAREST_MAX_RADIUS_KM, user_lat, user_lon)).fetchone()
+            
+            if ambulance is None:
+                return {
+                    "success": False,
+                    "error": "No available ambulances found nearby",
+                    "suggestion": "Try expanding search or contact emergency services directly"
+                }
+            
+            # Create dispatch record
+            dispatch_id = conn.execute("""
+                INSERT INTO ambulance_dispatches 
+                (ambulance_id, user_location_lat, user_location_lon, emergency_type, patient_count, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?, 'dispatched')
+            """, (ambulance['id'], user_lat, user_lon, emergency_type, patient_count, notes)).lastrowid
+        
+        distance = calculate_distance(user_lat, user_lon, ambulance['latitude'], ambulance['longitude'])
+        return _dispatch_confirmation(dispatch_id, ambulance, user_lat, user_lon, distance,
+                                      emergency_type, patient_count)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
 def update_ambulance_status(ambulance_id: int, new_status: str) -> Dict[str, Any]:
     """
@@ -324,16 +462,13 @@ def update_ambulance_status(ambulance_id: int, new_status: str) -> Dict[str, Any
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("UPDATE ambulances SET status = ? WHERE id = ?", (new_status, ambulance_id))
+        with conn:
+            cursor = conn.cursor()
         
-        if cursor.rowcount == 0:
-            conn.close()
-            return {"success": False, "error": "Ambulance not found"}
+            cursor.execute("UPDATE ambulances SET status = ? WHERE id = ?", (new_status, ambulance_id))
         
-        conn.commit()
-        conn.close()
+            if cursor.rowcount == 0:
+                return {"success": False, "error": "Ambulance not found"}
         
         return {
             "success": True,
@@ -357,30 +492,27 @@ def complete_dispatch(dispatch_id: int, notes: Optional[str] = None) -> Dict[str
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        with conn:
+            cursor = conn.cursor()
         
-        # Get dispatch info
-        cursor.execute("SELECT * FROM ambulance_dispatches WHERE id = ?", (dispatch_id,))
-        dispatch = cursor.fetchone()
+            # Get dispatch info
+            cursor.execute("SELECT * FROM ambulance_dispatches WHERE id = ?", (dispatch_id,))
+            dispatch = cursor.fetchone()
         
-        if not dispatch:
-            conn.close()
-            return {"success": False, "error": "Dispatch not found"}
+            if not dispatch:
+                return {"success": False, "error": "Dispatch not found"}
         
-        # Update dispatch status
-        cursor.execute("""
-            UPDATE ambulance_dispatches 
-            SET status = 'completed', arrival_time = CURRENT_TIMESTAMP, notes = ?
-            WHERE id = ?
-        """, (notes, dispatch_id))
+            # Update dispatch status
+            cursor.execute("""
+                UPDATE ambulance_dispatches 
+                SET status = 'completed', arrival_time = CURRENT_TIMESTAMP, notes = ?
+                WHERE id = ?
+            """, (notes, dispatch_id))
         
-        # Make ambulance available again
-        cursor.execute("""
-            UPDATE ambulances SET status = 'available' WHERE id = ?
-        """, (dispatch['ambulance_id'],))
-        
-        conn.commit()
-        conn.close()
+            # Make ambulance available again
+            cursor.execute("""
+                UPDATE ambulances SET status = 'available' WHERE id = ?
+            """, (dispatch['ambulance_id'],))
         
         return {
             "success": True,
@@ -403,17 +535,24 @@ def get_dispatch_history(limit: int = 10) -> Dict[str, Any]:
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples; dicts are built below
         
         cursor.execute("""
-            SELECT d.*, a.vehicle_number, a.station_name
+            SELECT d.id, d.ambulance_id, d.user_location_lat, d.user_location_lon,
+                   d.emergency_type, d.patient_count, d.status, d.dispatch_time,
+                   d.arrival_time, d.notes, a.vehicle_number, a.station_name
             FROM ambulance_dispatches d
             JOIN ambulances a ON d.ambulance_id = a.id
             ORDER BY d.dispatch_time DESC
             LIMIT ?
         """, (limit,))
         
-        dispatches = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        dispatches = [
+            {'id': r[0], 'ambulance_id': r[1], 'user_location_lat': r[2], 'user_location_lon': r[3],
+             'emergency_type': r[4], 'patient_count': r[5], 'status': r[6], 'dispatch_time': r[7],
+             'arrival_time': r[8], 'notes': r[9], 'vehicle_number': r[10], 'station_name': r[11]}
+            for r in cursor.fetchall()
+        ]
         
         return {
             "success": True,
@@ -441,28 +580,20 @@ def assess_ambulance_need(
     Returns:
         Dict containing assessment and recommended ambulance type
     """
-    critical_symptoms = [
-        'chest pain', 'heart attack', 'stroke', 'severe bleeding',
-        'not breathing', 'unconscious', 'seizure', 'severe burn',
-        'head injury', 'spinal injury', 'drowning', 'poisoning'
-    ]
-    
-    moderate_symptoms = [
-        'broken bone', 'fracture', 'deep cut', 'difficulty breathing',
-        'allergic reaction', 'high fever', 'severe pain', 'fainting'
-    ]
-    
-    # Check symptom severity
-    symptoms_lower = [s.lower() for s in symptoms]
-    has_critical = any(cs in ' '.join(symptoms_lower) for cs in critical_symptoms)
-    has_moderate = any(ms in ' '.join(symptoms_lower) for ms in moderate_symptoms)
+    # Determine urgency and ambulance type; an unconscious or non-breathing
+    # patient is critical whatever the symptoms, so the text is only scanned
+    # when needed, and the moderate scan only when nothing critical matched
+    if not patient_breathing or not patient_conscious:
+        critical = True
+    else:
+        symptoms_text = ' '.join(symptoms).lower()
+        critical = CRITICAL_SYMPTOMS_RE.search(symptoms_text) is not None
     
-    # Determine urgency and ambulance type
-    if not patient_breathing or not patient_conscious or has_critical:
+    if critical:
         urgency = "CRITICAL"
         ambulance_type = "icu"
         recommendation = "ICU ambulance with advanced life support needed immediately"
-    elif has_moderate or patient_count > 2:
+    elif MODERATE_SYMPTOMS_RE.search(symptoms_text) or patient_count > 2:
         urgency = "HIGH"
         ambulance_type = "advanced"
         recommendation = "Advanced ambulance with paramedics recommended"
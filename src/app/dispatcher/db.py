@@ -0,0 +1,49 @@
+"""
+Database Connection Module
+Long-lived SQLite connections shared by the dispatcher tools
+"""
+
+import sqlite3
+import threading
+
+from .geo import haversine_km
+
+_local = threading.local()
+
+def get_connection(database_path: str) -> sqlite3.Connection:
+    """
+    Get this thread's connection to a database (opened once, then reused)
+    
+    Args:
+        database_path: Path to the SQLite database file
+    
+    Returns:
+        Connection with row factory, WAL and read-tuning pragmas applied
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    
+    conn = conns.get(database_path)
+    if conn is None:
+        # Query texts are fixed per code path, so prepared statements are
+        # reused from the cache; leave headroom for every tool's queries
+        conn = sqlite3.connect(database_path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # Read pages straight from the OS page cache and keep a larger page cache
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-32000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        # Exact distance for use inside SQL
+        conn.create_function("haversine_km", 4, haversine_km, deterministic=True)
+        conns[database_path] = conn
+    return conn
+
+def db_version(conn: sqlite3.Connection) -> tuple:
+    """
+    Cheap token that changes whenever the database does: data_version moves on
+    commits from other connections, total_changes on writes from this one
+    """
+    return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
@@ -3,35 +3,115 @@ Fire Brigade Tools Module
 Tools for fire emergency dispatch, retrieval, and management
 """
 
-import sqlite3
-import math
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, Any
 import os
+import threading
+import numpy as np
 
-DATABASE_PATH = os.path.join(os.path.dirname(__file__), "../../../database/fire.db")
+from .geo import (
+    haversine_km,
+    origin_terms,
+    haversine_array,
+    haversine_from_radians,
+    bounding_box,
+    radian_terms,
+    within_radius,
+)
+from .db import get_connection, db_version
+
+# Resolved once, so every thread keys its shared connection on the same path
+DATABASE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../database/fire.db"))
+
+# dispatch_nearest_fire_truck only considers trucks within this distance
+NEAREST_TRUCK_RADIUS_KM = 30.0
+# dispatch_multiple_units picks the nearest trucks within this distance
+MULTI_UNIT_RADIUS_KM = 50.0
+
+# assess_fire_severity scoring: high-risk building types, points per spread
+# rate, and the response tier for each score (scores of 8 and above are CRITICAL)
+HIGH_RISK_BUILDINGS = frozenset({'industrial', 'commercial', 'forest'})
+SPREAD_RATE_SCORES = {'fast': 3, 'moderate': 1}
+
+_LOW = ("LOW", 1, ("standard",), "Single unit response. Monitor for changes.")
+_MEDIUM = ("MEDIUM", 1, ("water_tender",), "Standard fire response. Stay low and evacuate.")
+_HIGH = ("HIGH", 2, ("water_tender", "rescue"), "Multiple fire units recommended. Begin evacuation.")
+_CRITICAL = ("CRITICAL", 4, ("water_tender", "ladder", "rescue"),
+             "Multiple units with rescue capability needed. Evacuate immediately.")
+SEVERITY_BY_SCORE = (_LOW, _LOW, _LOW, _MEDIUM, _MEDIUM, _HIGH, _HIGH, _HIGH, _CRITICAL)
+
+# Returned as-is by every assess_fire_severity call
+FIRE_SAFETY_INSTRUCTIONS = (
+    "Stay low to avoid smoke inhalation",
+    "Do not use elevators",
+    "Close doors behind you to slow fire spread",
+    "Feel doors before opening - if hot, use another exit",
+    "If trapped, seal door gaps and signal from window"
+)
+
+_local = threading.local()
 
 def get_db_connection():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's database connection (opened once, then reused)"""
+    return get_connection(DATABASE_PATH)
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates using Haversine formula (km)"""
-    R = 6371
-    lat1_rad, lat2_rad = math.radians(lat1), math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
+    return haversine_km(lat1, lon1, lat2, lon2)
 
 def estimate_arrival_time(distance_km: float, avg_speed_kmh: float = 50) -> int:
     """Estimate arrival time in minutes (fire trucks often faster due to sirens)"""
     return max(1, int((distance_km / avg_speed_kmh) * 60))
 
+def _truck_coords(rows: list) -> tuple:
+    """Latitude and longitude arrays for fetched truck rows (station position)"""
+    lats = np.fromiter((row[5] for row in rows), dtype=np.float64, count=len(rows))
+    lons = np.fromiter((row[6] for row in rows), dtype=np.float64, count=len(rows))
+    return lats, lons
+
+def _truck_dict(row: tuple) -> Dict[str, Any]:
+    """Result dict for a fetched fire truck row"""
+    return {
+        'id': row[0], 'vehicle_number': row[1], 'truck_type': row[2], 'water_capacity': row[3],
+        'station_name': row[4], 'latitude': row[5], 'longitude': row[6], 'contact_number': row[7]
+    }
+
+def _load_stations(conn) -> tuple:
+    """
+    This thread's snapshot of the fire_stations table, reloaded only when the
+    database has changed: (rows as tuples, latitudes and longitudes in radians,
+    cos(latitude), available_units)
+    """
+    version = db_version(conn)
+    cached = getattr(_local, "stations", None)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples, in the column order below
+    cursor.execute("""
+        SELECT id, station_name, station_code, latitude, longitude, 
+               contact_number, available_units, total_units
+        FROM fire_stations
+        ORDER BY id
+    """)
+    rows = cursor.fetchall()
+    # Station-side Haversine terms are computed once per snapshot, not per query
+    stations = (
+        rows,
+        *radian_terms(rows, 3, 4),
+        np.fromiter((r[6] for r in rows), dtype=np.int64, count=len(rows)),
+    )
+    _local.stations = (version, stations)
+    return stations
+
+def _station_dict(row: tuple) -> Dict[str, Any]:
+    """Result dict for a cached fire_stations row"""
+    return {
+        'id': row[0], 'station_name': row[1], 'station_code': row[2], 'latitude': row[3],
+        'longitude': row[4], 'contact_number': row[5], 'available_units': row[6],
+        'total_units': row[7]
+    }
+
 
 # ============== TOOL FUNCTIONS FOR LLM ==============
 
@@ -44,14 +124,7 @@ def get_all_fire_stations() -> Dict[str, Any]:
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, station_name, station_code, latitude, longitude, 
-                   contact_number, available_units, total_units
-            FROM fire_stations
-        """)
-        stations = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        stations = [_station_dict(row) for row in _load_stations(conn)[0]]
         
         return {
             "success": True,
@@ -71,6 +144,7 @@ def get_available_fire_trucks() -> Dict[str, Any]:
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuples, in the column order below
         cursor.execute("""
             SELECT t.id, t.vehicle_number, t.truck_type, t.water_capacity,
                    s.station_name, s.latitude, s.longitude, s.contact_number
@@ -78,8 +152,7 @@ def get_available_fire_trucks() -> Dict[str, Any]:
             JOIN fire_stations s ON t.station_id = s.id
             WHERE t.status = 'available'
         """)
-        trucks = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        trucks = [_truck_dict(row) for row in cursor.fetchall()]
         
         return {
             "success": True,
@@ -107,27 +180,20 @@ def get_nearby_fire_stations(
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT id, station_name, station_code, latitude, longitude, 
-                   contact_number, available_units, total_units
-            FROM fire_stations
-            WHERE available_units > 0
-        """)
-        stations = cursor.fetchall()
-        conn.close()
+        # Station metadata and coordinates come from the cached snapshot
+        rows, lats_rad, lons_rad, cos_lats, available_units = _load_stations(conn)
+        candidates = np.flatnonzero(available_units > 0)
+        distances = haversine_from_radians(*origin_terms(user_lat, user_lon), lats_rad[candidates],
+                                           lons_rad[candidates], cos_lats[candidates])
         
         nearby = []
-        for station in stations:
-            distance = calculate_distance(user_lat, user_lon, station['latitude'], station['longitude'])
-            if distance <= radius_km:
-                station_dict = dict(station)
-                station_dict['distance_km'] = round(distance, 2)
-                station_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
-                nearby.append(station_dict)
-        
-        nearby.sort(key=lambda x: x['distance_km'])
+        for j in within_radius(distances, radius_km):
+            distance = float(distances[j])
+            station_dict = _station_dict(rows[candidates[j]])
+            station_dict['distance_km'] = round(distance, 2)
+            station_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
+            nearby.append(station_dict)
         
         return {
             "success": True,
@@ -161,33 +227,46 @@ def get_nearby_fire_trucks(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        query = """
-            SELECT t.id, t.vehicle_number, t.truck_type, t.water_capacity,
-                   s.station_name, s.latitude, s.longitude, s.contact_number
-            FROM fire_trucks t
-            JOIN fire_stations s ON t.station_id = s.id
-            WHERE t.status = 'available'
-        """
-        params = []
+        # Only trucks whose station is inside the search box reach the Haversine step
+        box = bounding_box(user_lat, user_lon, radius_km)
+        if box:
+            query = """
+                SELECT t.id, t.vehicle_number, t.truck_type, t.water_capacity,
+                       s.station_name, s.latitude, s.longitude, s.contact_number
+                FROM fire_stations_rtree r
+                JOIN fire_stations s ON s.id = r.id
+                JOIN fire_trucks t ON t.station_id = s.id
+                WHERE t.status = 'available'
+                  AND r.max_lat >= ? AND r.min_lat <= ?
+                  AND r.max_lon >= ? AND r.min_lon <= ?
+            """
+            params = list(box)
+        else:
+            query = """
+                SELECT t.id, t.vehicle_number, t.truck_type, t.water_capacity,
+                       s.station_name, s.latitude, s.longitude, s.contact_number
+                FROM fire_trucks t
+                JOIN fire_stations s ON t.station_id = s.id
+                WHERE t.status = 'available'
+            """
+            params = []
         
         if truck_type:
             query += " AND t.truck_type = ?"
             params.append(truck_type)
         
+        cursor.row_factory = None  # plain tuples, in the column order above
         cursor.execute(query, params)
         trucks = cursor.fetchall()
-        conn.close()
         
+        distances = haversine_array(user_lat, user_lon, *_truck_coords(trucks))
         nearby = []
-        for truck in trucks:
-            distance = calculate_distance(user_lat, user_lon, truck['latitude'], truck['longitude'])
-            if distance <= radius_km:
-                truck_dict = dict(truck)
-                truck_dict['distance_km'] = round(distance, 2)
-                truck_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
-                nearby.append(truck_dict)
-        
-        nearby.sort(key=lambda x: x['distance_km'])
+        for i in within_radius(distances, radius_km):
+            distance = float(distances[i])
+            truck_dict = _truck_dict(trucks[i])
+            truck_dict['distance_km'] = round(distance, 2)
+            truck_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
+            nearby.append(truck_dict)
         
         return {
             "success": True,
@@ -198,6 +277,30 @@ def get_nearby_fire_trucks(
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _dispatch_confirmation(dispatch_id: int, truck, user_lat: float, user_lon: float, distance: float,
+                           fire_type: str, severity: str, people_trapped: int) -> Dict[str, Any]:
+    """Confirmation returned for one dispatched fire truck"""
+    eta_minutes = estimate_arrival_time(distance)
+    return {
+        "success": True,
+        "dispatch_id": dispatch_id,
+        "fire_truck": {
+            "id": truck['id'],
+            "vehicle_number": truck['vehicle_number'],
+            "truck_type": truck['truck_type'],
+            "water_capacity": truck['water_capacity'],
+            "station_name": truck['station_name'],
+            "contact": truck['contact_number']
+        },
+        "destination": {"latitude": user_lat, "longitude": user_lon},
+        "distance_km": round(distance, 2),
+        "estimated_arrival_minutes": eta_minutes,
+        "fire_type": fire_type,
+        "severity": severity,
+        "people_trapped": people_trapped,
+        "message": f"Fire truck {truck['vehicle_number']} dispatched. ETA: {eta_minutes} minutes"
+    }
+
 def dispatch_fire_truck(
     fire_truck_id: int,
     user_lat: float,
@@ -224,68 +327,54 @@ def dispatch_fire_truck(
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        # Check, claim and record the dispatch in one transaction
+        with conn:
+            cursor = conn.cursor()
         
-        # Get fire truck info
-        cursor.execute("""
-            SELECT t.*, s.station_name, s.latitude, s.longitude, s.contact_number, s.id as station_id
-            FROM fire_trucks t
-            JOIN fire_stations s ON t.station_id = s.id
-            WHERE t.id = ?
-        """, (fire_truck_id,))
-        truck = cursor.fetchone()
+            # Get fire truck info
+            cursor.execute("""
+                SELECT t.*, s.station_name, s.latitude, s.longitude, s.contact_number, s.id as station_id
+                FROM fire_trucks t
+                JOIN fire_stations s ON t.station_id = s.id
+                WHERE t.id = ?
+            """, (fire_truck_id,))
+            truck = cursor.fetchone()
         
-        if not truck:
-            conn.close()
-            return {"success": False, "error": "Fire truck not found"}
+            if not truck:
+                return {"success": False, "error": "Fire truck not found"}
         
-        if truck['status'] != 'available':
-            conn.close()
-            return {"success": False, "error": f"Fire truck is currently {truck['status']}"}
+            if truck['status'] != 'available':
+                return {"success": False, "error": f"Fire truck is currently {truck['status']}"}
         
-        distance = calculate_distance(user_lat, user_lon, truck['latitude'], truck['longitude'])
-        eta_minutes = estimate_arrival_time(distance)
+            distance = calculate_distance(user_lat, user_lon, truck['latitude'], truck['longitude'])
         
-        # Update truck status
-        cursor.execute("UPDATE fire_trucks SET status = 'dispatched' WHERE id = ?", (fire_truck_id,))
+            # Update truck status; the status guard keeps a concurrent
+            # dispatch from claiming the same truck twice
+            claimed = cursor.execute(
+                "UPDATE fire_trucks SET status = 'dispatched' WHERE id = ? AND status = 'available'",
+                (fire_truck_id,)
+            ).rowcount
+            if not claimed:
+                return {"success": False, "error": "Fire truck is currently dispatched"}
         
-        # Update station available units
-        cursor.execute("""
-            UPDATE fire_stations 
-            SET available_units = available_units - 1 
-            WHERE id = ?
-        """, (truck['station_id'],))
+            # Update station available units
+            cursor.execute("""
+                UPDATE fire_stations 
+                SET available_units = available_units - 1 
+                WHERE id = ?
+            """, (truck['station_id'],))
         
-        # Create dispatch record
-        cursor.execute("""
-            INSERT INTO fire_dispatches 
-            (fire_truck_id, user_location_lat, user_location_lon, fire_type, severity, people_trapped, notes, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'dispatched')
-        """, (fire_truck_id, user_lat, user_lon, fire_type, severity, people_trapped, notes))
+            # Create dispatch record
+            cursor.execute("""
+                INSERT INTO fire_dispatches 
+                (fire_truck_id, user_location_lat, user_location_lon, fire_type, severity, people_trapped, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'dispatched')
+            """, (fire_truck_id, user_lat, user_lon, fire_type, severity, people_trapped, notes))
         
-        dispatch_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            dispatch_id = cursor.lastrowid
         
-        return {
-            "success": True,
-            "dispatch_id": dispatch_id,
-            "fire_truck": {
-                "id": truck['id'],
-                "vehicle_number": truck['vehicle_number'],
-                "truck_type": truck['truck_type'],
-                "water_capacity": truck['water_capacity'],
-                "station_name": truck['station_name'],
-                "contact": truck['contact_number']
-            },
-            "destination": {"latitude": user_lat, "longitude": user_lon},
-            "distance_km": round(distance, 2),
-            "estimated_arrival_minutes": eta_minutes,
-            "fire_type": fire_type,
-            "severity": severity,
-            "people_trapped": people_trapped,
-            "message": f"Fire truck {truck['vehicle_number']} dispatched. ETA: {eta_minutes} minutes"
-        }
+        return _dispatch_confirmation(dispatch_id, truck, user_lat, user_lon, distance,
+                                      fire_type, severity, people_trapped)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
@@ -313,21 +402,37 @@ def dispatch_nearest_fire_truck(
     Returns:
         Dict containing dispatch confirmation
     """
-    # Find nearby trucks
-    result = get_nearby_fire_trucks(user_lat, user_lon, radius_km=30, truck_type=truck_type)
-    
-    if not result["success"]:
-        return result
+    try:
+        conn = get_db_connection()
+        box = bounding_box(user_lat, user_lon, NEAREST_TRUCK_RADIUS_KM)
+        in_box = """
+            AND s.id IN (SELECT id FROM fire_stations_rtree
+                         WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)
+        """ if box else ""
+        
+        # Find the nearest truck in SQL; only the winning row comes back
+        nearest_truck = conn.execute(f"""
+            SELECT t.id, haversine_km(?, ?, s.latitude, s.longitude) AS distance_km
+            FROM fire_trucks t
+            JOIN fire_stations s ON t.station_id = s.id
+            WHERE t.status = 'available'
+              AND (? IS NULL OR t.truck_type = ?)
+              {in_box}
+              AND distance_km <= ?
+            ORDER BY distance_km, t.id
+            LIMIT 1
+        """, (user_lat, user_lon, truck_type or None, truck_type or None, *(box or ()),
+              NEAREST_TRUCK_RADIUS_KM)).fetchone()
+    except Exception as e:
+        return {"success": False, "error": str(e)}
     
-    if result["count"] == 0:
+    if nearest_truck is None:
         return {
             "success": False,
             "error": "No available fire trucks found nearby",
             "suggestion": "Call emergency services directly at 101"
         }
     
-    nearest_truck = result["fire_trucks"][0]
-    
     return dispatch_fire_truck(
         fire_truck_id=nearest_truck["id"],
         user_lat=user_lat,
@@ -363,27 +468,59 @@ def dispatch_multiple_units(
     dispatched = []
     failed = []
     
-    result = get_nearby_fire_trucks(user_lat, user_lon, radius_km=50)
-    
-    if not result["success"]:
-        return result
-    
-    available_trucks = result["fire_trucks"]
-    
-    for i, truck in enumerate(available_trucks[:units_needed]):
-        dispatch_result = dispatch_fire_truck(
-            fire_truck_id=truck["id"],
-            user_lat=user_lat,
-            user_lon=user_lon,
-            fire_type=fire_type,
-            severity=severity,
-            notes=f"Multi-unit dispatch #{i+1}. {notes or ''}"
-        )
-        
-        if dispatch_result["success"]:
-            dispatched.append(dispatch_result)
-        else:
-            failed.append({"truck_id": truck["id"], "error": dispatch_result["error"]})
+    try:
+        conn = get_db_connection()
+        box = bounding_box(user_lat, user_lon, MULTI_UNIT_RADIUS_KM)
+        in_box = """
+            AND s.id IN (SELECT id FROM fire_stations_rtree
+                         WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)
+        """ if box else ""
+        
+        # Pick, claim and record every unit in one transaction
+        with conn:
+            trucks = conn.execute(f"""
+                SELECT t.id, t.vehicle_number, t.truck_type, t.water_capacity, t.station_id,
+                       s.station_name, s.contact_number,
+                       haversine_km(?, ?, s.latitude, s.longitude) AS distance_km
+                FROM fire_trucks t
+                JOIN fire_stations s ON t.station_id = s.id
+                WHERE t.status = 'available'
+                  {in_box}
+                  AND distance_km <= ?
+                ORDER BY distance_km, t.id
+                LIMIT ?
+            """, (user_lat, user_lon, *(box or ()), MULTI_UNIT_RADIUS_KM, max(units_needed, 0))).fetchall()
+            
+            if trucks:
+                # The status guard skips any truck a concurrent dispatch took first
+                placeholders = ",".join("?" * len(trucks))
+                claimed = {row[0] for row in conn.execute(f"""
+                    UPDATE fire_trucks SET status = 'dispatched'
+                    WHERE id IN ({placeholders}) AND status = 'available'
+                    RETURNING id
+                """, [truck['id'] for truck in trucks]).fetchall()}
+                
+                conn.executemany("""
+                    UPDATE fire_stations 
+                    SET available_units = available_units - 1 
+                    WHERE id = ?
+                """, [(truck['station_id'],) for truck in trucks if truck['id'] in claimed])
+            
+            for i, truck in enumerate(trucks):
+                if truck['id'] not in claimed:
+                    failed.append({"truck_id": truck['id'], "error": "Fire truck is currently dispatched"})
+                    continue
+                
+                dispatch_id = conn.execute("""
+                    INSERT INTO fire_dispatches 
+                    (fire_truck_id, user_location_lat, user_location_lon, fire_type, severity, people_trapped, notes, status)
+                    VALUES (?, ?, ?, ?, ?, 0, ?, 'dispatched')
+                """, (truck['id'], user_lat, user_lon, fire_type, severity,
+                      f"Multi-unit dispatch #{i+1}. {notes or ''}")).lastrowid
+                dispatched.append(_dispatch_confirmation(dispatch_id, truck, user_lat, user_lon,
+                                                         truck['distance_km'], fire_type, severity, 0))
+    except Exception as e:
+        return {"success": False, "error": str(e)}
     
     return {
         "success": len(dispatched) > 0,
@@ -412,35 +549,33 @@ def update_fire_truck_status(fire_truck_id: int, new_status: str) -> Dict[str, A
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get current status and station
-        cursor.execute("""
-            SELECT t.status, t.station_id FROM fire_trucks t WHERE t.id = ?
-        """, (fire_truck_id,))
-        truck = cursor.fetchone()
+        # Writes commit together, or roll back together on error
+        with conn:
+            cursor = conn.cursor()
         
-        if not truck:
-            conn.close()
-            return {"success": False, "error": "Fire truck not found"}
+            # Get current status and station
+            cursor.execute("""
+                SELECT t.status, t.station_id FROM fire_trucks t WHERE t.id = ?
+            """, (fire_truck_id,))
+            truck = cursor.fetchone()
         
-        old_status = truck['status']
+            if not truck:
+                return {"success": False, "error": "Fire truck not found"}
         
-        # Update truck status
-        cursor.execute("UPDATE fire_trucks SET status = ? WHERE id = ?", (new_status, fire_truck_id))
+            old_status = truck['status']
         
-        # Update station available units if status changed to/from available
-        if old_status != 'available' and new_status == 'available':
-            cursor.execute("""
-                UPDATE fire_stations SET available_units = available_units + 1 WHERE id = ?
-            """, (truck['station_id'],))
-        elif old_status == 'available' and new_status != 'available':
-            cursor.execute("""
-                UPDATE fire_stations SET available_units = available_units - 1 WHERE id = ?
-            """, (truck['station_id'],))
+            # Update truck status
+            cursor.execute("UPDATE fire_trucks SET status = ? WHERE id = ?", (new_status, fire_truck_id))
         
-        conn.commit()
-        conn.close()
+            # Update station available units if status changed to/from available
+            if old_status != 'available' and new_status == 'available':
+                cursor.execute("""
+                    UPDATE fire_stations SET available_units = available_units + 1 WHERE id = ?
+                """, (truck['station_id'],))
+            elif old_status == 'available' and new_status != 'available':
+                cursor.execute("""
+                    UPDATE fire_stations SET available_units = available_units - 1 WHERE id = ?
+                """, (truck['station_id'],))
         
         return {
             "success": True,
@@ -465,39 +600,29 @@ def complete_fire_dispatch(dispatch_id: int, notes: Optional[str] = None) -> Dic
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM fire_dispatches WHERE id = ?", (dispatch_id,))
-        dispatch = cursor.fetchone()
-        
-        if not dispatch:
-            conn.close()
-            return {"success": False, "error": "Dispatch not found"}
-        
-        # Update dispatch status
-        cursor.execute("""
-            UPDATE fire_dispatches 
-            SET status = 'resolved', resolved_time = CURRENT_TIMESTAMP, notes = ?
-            WHERE id = ?
-        """, (notes, dispatch_id))
-        
-        # Make truck available
-        cursor.execute("""
-            UPDATE fire_trucks SET status = 'available' WHERE id = ?
-        """, (dispatch['fire_truck_id'],))
-        
-        # Update station available units
-        cursor.execute("""
-            SELECT station_id FROM fire_trucks WHERE id = ?
-        """, (dispatch['fire_truck_id'],))
-        truck = cursor.fetchone()
-        
-        cursor.execute("""
-            UPDATE fire_stations SET available_units = available_units + 1 WHERE id = ?
-        """, (truck['station_id'],))
-        
-        conn.commit()
-        conn.close()
+        # Resolve the dispatch and free the truck in one transaction
+        with conn:
+            # Update dispatch status; RETURNING doubles as the existence check
+            dispatch = conn.execute("""
+                UPDATE fire_dispatches 
+                SET status = 'resolved', resolved_time = CURRENT_TIMESTAMP, notes = ?
+                WHERE id = ?
+                RETURNING fire_truck_id
+            """, (notes, dispatch_id)).fetchone()
+        
+            if not dispatch:
+                return {"success": False, "error": "Dispatch not found"}
+        
+            # Make truck available
+            conn.execute("""
+                UPDATE fire_trucks SET status = 'available' WHERE id = ?
+            """, (dispatch['fire_truck_id'],))
+        
+            # Update station available units
+            conn.execute("""
+                UPDATE fire_stations SET available_units = available_units + 1
+                WHERE id = (SELECT station_id FROM fire_trucks WHERE id = ?)
+            """, (dispatch['fire_truck_id'],))
         
         return {
             "success": True,
@@ -529,58 +654,19 @@ def assess_fire_severity(
     Returns:
         Dict containing severity assessment and recommendations
     """
-    severity_score = 0
-    
-    # Smoke and flames
-    if smoke_visible:
-        severity_score += 1
-    if flames_visible:
-        severity_score += 2
-    
-    # People trapped
-    if people_trapped > 0:
-        severity_score += 3
-    if people_trapped > 5:
-        severity_score += 2
-    
-    # Building type risk
-    high_risk_buildings = ['industrial', 'commercial', 'forest']
-    if building_type.lower() in high_risk_buildings:
-        severity_score += 2
-    
-    # Multi-story
-    if floor_count > 3:
-        severity_score += 2
-    elif floor_count > 1:
-        severity_score += 1
-    
-    # Spread rate
-    if spread_rate == 'fast':
-        severity_score += 3
-    elif spread_rate == 'moderate':
-        severity_score += 1
+    # Score each factor with table lookups instead of an if-chain
+    severity_score = (
+        (1 if smoke_visible else 0)
+        + (2 if flames_visible else 0)
+        + (3 if people_trapped > 0 else 0)
+        + (2 if people_trapped > 5 else 0)
+        + (2 if building_type.casefold() in HIGH_RISK_BUILDINGS else 0)
+        + (2 if floor_count > 3 else 1 if floor_count > 1 else 0)
+        + SPREAD_RATE_SCORES.get(spread_rate, 0)
+    )
     
     # Determine severity level
-    if severity_score >= 8:
-        severity = "CRITICAL"
-        units_recommended = 4
-        truck_types = ["water_tender", "ladder", "rescue"]
-        recommendation = "Multiple units with rescue capability needed. Evacuate immediately."
-    elif severity_score >= 5:
-        severity = "HIGH"
-        units_recommended = 2
-        truck_types = ["water_tender", "rescue"]
-        recommendation = "Multiple fire units recommended. Begin evacuation."
-    elif severity_score >= 3:
-        severity = "MEDIUM"
-        units_recommended = 1
-        truck_types = ["water_tender"]
-        recommendation = "Standard fire response. Stay low and evacuate."
-    else:
-        severity = "LOW"
-        units_recommended = 1
-        truck_types = ["standard"]
-        recommendation = "Single unit response. Monitor for changes."
+    severity, units_recommended, truck_types, recommendation = SEVERITY_BY_SCORE[min(severity_score, 8)]
     
     return {
         "success": True,
@@ -600,13 +686,7 @@ def assess_fire_severity(
                 "spread_rate": spread_rate
             }
         },
-        "safety_instructions": [
-            "Stay low to avoid smoke inhalation",
-            "Do not use elevators",
-            "Close doors behind you to slow fire spread",
-            "Feel doors before opening - if hot, use another exit",
-            "If trapped, seal door gaps and signal from window"
-        ]
+        "safety_instructions": FIRE_SAFETY_INSTRUCTIONS
     }
 
 
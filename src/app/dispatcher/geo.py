@@ -0,0 +1,139 @@
+"""
+Geo Helpers Module
+Distance math shared by the ambulance, fire and police tools
+"""
+
+import math
+from typing import Optional
+import numpy as np
+
+try:
+    from numba import njit  # optional: JIT-compiled scalar Haversine
+except ImportError:
+    njit = None
+
+# Degrees -> radians as a plain multiply instead of a radians() call
+DEG2RAD = math.pi / 180.0
+
+# Flat-earth prefilter: accurate well within the margin below this radius,
+# skipped above it
+KM_PER_DEGREE = 6371 * math.pi / 180
+EQUIRECT_MARGIN = 1.01
+EQUIRECT_MAX_RADIUS_KM = 500.0
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Calculate distance between two coordinates using Haversine formula
+    Returns distance in kilometers
+    """
+    R = 6371  # Earth's radius in kilometers
+    
+    lat1_rad = lat1 * DEG2RAD
+    lat2_rad = lat2 * DEG2RAD
+    delta_lat = (lat2 - lat1) * DEG2RAD
+    delta_lon = (lon2 - lon1) * DEG2RAD
+    
+    sin_lat = math.sin(delta_lat/2)
+    sin_lon = math.sin(delta_lon/2)
+    a = sin_lat*sin_lat + math.cos(lat1_rad) * math.cos(lat2_rad) * sin_lon*sin_lon
+    c = 2 * math.asin(math.sqrt(a))
+    
+    return R * c
+
+if njit is not None:
+    haversine_km = njit(cache=True, fastmath=True)(haversine_km)
+
+def origin_terms(user_lat: float, user_lon: float) -> tuple:
+    """User-side terms of the Haversine formula, computed once per query"""
+    lat_rad = user_lat * DEG2RAD
+    return lat_rad, math.cos(lat_rad), user_lon * DEG2RAD
+
+def haversine_from_origin(user_lat_rad: float, user_cos_lat: float, user_lon_rad: float,
+                          lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distances in kilometers from precomputed origin terms to arrays of coordinates"""
+    lat2_rad = lats * DEG2RAD
+    return haversine_from_radians(user_lat_rad, user_cos_lat, user_lon_rad,
+                                  lat2_rad, lons * DEG2RAD, np.cos(lat2_rad))
+
+def haversine_from_radians(user_lat_rad: float, user_cos_lat: float, user_lon_rad: float,
+                           lats_rad: np.ndarray, lons_rad: np.ndarray, cos_lats: np.ndarray) -> np.ndarray:
+    """
+    Distances in kilometers from precomputed origin terms to points whose
+    radian coordinates and cos(latitude) were computed ahead of time
+    """
+    R = 6371  # Earth's radius in kilometers
+    
+    sin_lat = np.sin((lats_rad - user_lat_rad) * 0.5)
+    sin_lon = np.sin((lons_rad - user_lon_rad) * 0.5)
+    a = sin_lat*sin_lat + user_cos_lat * cos_lats * sin_lon*sin_lon
+    c = 2 * np.arcsin(np.sqrt(a))
+    
+    return R * c
+
+def radian_terms(rows: list, lat_col: int, lon_col: int) -> tuple:
+    """
+    Point-side Haversine terms for fetched rows: latitudes and longitudes in
+    radians and cos(latitude), computed once so queries only do the origin side
+    """
+    count = len(rows)
+    lats_rad = np.fromiter((r[lat_col] for r in rows), dtype=np.float64, count=count) * DEG2RAD
+    lons_rad = np.fromiter((r[lon_col] for r in rows), dtype=np.float64, count=count) * DEG2RAD
+    return lats_rad, lons_rad, np.cos(lats_rad)
+
+def within_radius(distances: np.ndarray, radius_km: float) -> np.ndarray:
+    """Indices of distances within radius_km, nearest first (ties keep their order)"""
+    inside = np.flatnonzero(distances <= radius_km)
+    return inside[np.argsort(distances[inside], kind='stable')]
+
+def haversine_array(user_lat: float, user_lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Vectorized Haversine distance from one point to arrays of coordinates
+    Returns distances in kilometers
+    """
+    return haversine_from_origin(*origin_terms(user_lat, user_lon), lats, lons)
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Optional[tuple]:
+    """
+    Latitude/longitude box containing every point within radius_km of (lat, lon)
+    Returns (min_lat, max_lat, min_lon, max_lon), or None if the circle
+    reaches a pole, spans the whole longitude range or crosses the antimeridian
+    """
+    R = 6371  # Earth's radius in kilometers
+    
+    angular = radius_km / R
+    min_lat = lat - math.degrees(angular)
+    max_lat = lat + math.degrees(angular)
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        return None
+    
+    ratio = math.sin(angular) / math.cos(lat * DEG2RAD)
+    if ratio >= 1:
+        return None
+    delta_lon = math.degrees(math.asin(ratio))
+    min_lon = lon - delta_lon
+    max_lon = lon + delta_lon
+    if min_lon < -180 or max_lon > 180:
+        return None
+    
+    return min_lat, max_lat, min_lon, max_lon
+
+def equirect_candidates(user_lat: float, user_lon: float, radius_km: float,
+                        lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Indices of points that may lie within radius_km, using a flat-earth
+    approximation (no trig per row). Never rejects a point that the exact
+    Haversine would keep; survivors still need the exact check.
+    """
+    if radius_km > EQUIRECT_MAX_RADIUS_KM:
+        return np.arange(len(lats))
+    
+    # Smallest cos(lat) across the search band, so east-west spans are never overestimated
+    band = math.degrees(radius_km / 6371)
+    cos_lat = math.cos(min(90.0, abs(user_lat) + band) * DEG2RAD)
+    limit_deg = radius_km * EQUIRECT_MARGIN / KM_PER_DEGREE
+    
+    dy = lats - user_lat
+    # Wrap into [-180, 180) so points across the antimeridian stay close
+    dlon = (lons - user_lon + 180) % 360 - 180
+    dx = dlon * cos_lat
+    return np.flatnonzero(dx*dx + dy*dy <= limit_deg * limit_deg)
@@ -4,42 +4,222 @@ Tools for police emergency dispatch, retrieval, and case management
 Handles kidnap, extortion, and general police emergencies
 """
 
-import sqlite3
-import math
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import os
-import random
-import string
+import secrets
+import threading
+import time
+import numpy as np
+
+from .geo import (
+    haversine_km,
+    origin_terms,
+    haversine_array,
+    haversine_from_radians,
+    bounding_box,
+    radian_terms,
+    within_radius,
+)
+from .db import get_connection, db_version
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "../../../database/police.db")
 
+# dispatch_nearest_patrol_unit only considers units within this distance
+NEAREST_UNIT_RADIUS_KM = 20.0
+# dispatch_multiple_units picks the nearest units within this distance
+MULTI_UNIT_RADIUS_KM = 30.0
+
+# Base threat score per emergency type; anything else scores 2
+THREAT_TYPE_SCORES = {
+    'kidnap': 4,
+    'extortion': 2,
+    'robbery': 3,
+    'assault': 3,
+    'threat': 1,
+    'suspicious_activity': 1
+}
+
+# (threat_level, units_recommended, require_rapid_response, recommendation, user_instructions)
+_LOW = ("LOW", 1, False, "Standard patrol response appropriate.", (
+    "Stay calm and observe",
+    "Note any useful details",
+    "Wait for police to arrive"
+))
+_MEDIUM = ("MEDIUM", 1, False, "Standard patrol response. Exercise caution.", (
+    "Stay alert and aware of surroundings",
+    "Move to a well-lit, public area if possible",
+    "Wait for police to arrive"
+))
+_HIGH = ("HIGH", 2, True, "Rapid response unit recommended. Priority dispatch.", (
+    "Move to a safe location if possible",
+    "Stay calm and do not provoke",
+    "Note descriptions of suspects if safe to do so",
+    "Keep communication open with emergency services"
+))
+_CRITICAL = ("CRITICAL", 4, True, "Armed response team required. Multiple units needed immediately.", (
+    "DO NOT confront the suspects",
+    "Find a safe hiding place if possible",
+    "Stay silent and do not draw attention",
+    "Keep phone on silent but stay connected",
+    "Wait for police to arrive"
+))
+THREAT_LEVEL_BY_SCORE = (_LOW, _LOW, _LOW, _LOW, _MEDIUM, _MEDIUM, _MEDIUM, _HIGH, _HIGH, _HIGH, _CRITICAL)
+
+# Returned as-is by get_safety_instructions, keyed by lowercase emergency type
+POLICE_SAFETY_INSTRUCTIONS = {
+    "kidnap": {
+        "immediate": (
+            "If you can communicate safely, share your location",
+            "Try to stay calm and do not resist violently",
+            "Observe and remember details about captors and location",
+            "Look for opportunities to escape only if safe",
+            "If possible, leave small clues for rescuers"
+        ),
+        "for_family": (
+            "Contact police immediately",
+            "Do not pay ransom without police guidance",
+            "Keep communication lines open",
+            "Document all communications from kidnappers"
+        )
+    },
+    "extortion": {
+        "immediate": (
+            "Do not make immediate payments",
+            "Document all threats and communications",
+            "Report to police before responding to demands",
+            "Do not delete any messages or evidence",
+            "Inform trusted family members or friends"
+        ),
+        "ongoing": (
+            "Keep police informed of all developments",
+            "Follow police guidance on responses",
+            "Maintain records of all incidents"
+        )
+    },
+    "robbery": {
+        "during": (
+            "Do not resist - your safety is priority",
+            "Follow instructions calmly",
+            "Avoid sudden movements",
+            "Do not make eye contact with weapons",
+            "Note physical descriptions if possible"
+        ),
+        "after": (
+            "Call police immediately",
+            "Do not touch anything at the scene",
+            "Note direction suspects fled",
+            "Get witness contact information"
+        )
+    },
+    "assault": {
+        "during": (
+            "Try to escape to safety if possible",
+            "Protect vital areas (head, neck)",
+            "Call for help loudly",
+            "Fight back only as last resort"
+        ),
+        "after": (
+            "Get to a safe location",
+            "Call emergency services",
+            "Seek medical attention",
+            "Do not wash or change clothes (evidence)"
+        )
+    },
+    "threat": {
+        "immediate": (
+            "Move to a safe, public location if possible",
+            "Do not engage with the person making threats",
+            "Try to note their appearance and any vehicle details",
+            "Contact trusted friends or family"
+        ),
+        "ongoing": (
+            "Document all threats (save messages, record times)",
+            "Report to police immediately",
+            "Consider changing your routine temporarily",
+            "Stay in well-lit, populated areas"
+        )
+    }
+}
+GENERAL_SAFETY_INSTRUCTIONS = {
+    "general": (
+        "Contact emergency services immediately",
+        "Move to a safe location",
+        "Stay calm and follow police instructions"
+    )
+}
+
+_local = threading.local()
+
 def get_db_connection():
-    """Get database connection with row factory"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get this thread's database connection (opened once, then reused)"""
+    return get_connection(DATABASE_PATH)
 
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two coordinates using Haversine formula (km)"""
-    R = 6371
-    lat1_rad, lat2_rad = math.radians(lat1), math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
+    return haversine_km(lat1, lon1, lat2, lon2)
+
+def _unit_coords(rows: list) -> tuple:
+    """Latitude and longitude arrays for fetched patrol unit rows"""
+    lats = np.fromiter((row[5] for row in rows), dtype=np.float64, count=len(rows))
+    lons = np.fromiter((row[6] for row in rows), dtype=np.float64, count=len(rows))
+    return lats, lons
+
+def _unit_dict(row: tuple) -> Dict[str, Any]:
+    """Result dict for a fetched patrol unit row"""
+    return {
+        'id': row[0], 'unit_code': row[1], 'vehicle_number': row[2], 'unit_type': row[3],
+        'officers_count': row[4], 'latitude': row[5], 'longitude': row[6],
+        'station_name': row[7], 'contact_number': row[8]
+    }
+
+def _load_stations(conn) -> tuple:
+    """
+    This thread's snapshot of the police_stations table, reloaded only when the
+    database has changed: (rows as tuples, latitudes and longitudes in radians,
+    cos(latitude))
+    """
+    version = db_version(conn)
+    cached = getattr(_local, "stations", None)
+    if cached is not None and cached[0] == version:
+        return cached[1]
     
-    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
+    cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples, in the column order below
+    cursor.execute("""
+        SELECT id, station_name, station_code, latitude, longitude, 
+               contact_number, jurisdiction_area
+        FROM police_stations
+        ORDER BY id
+    """)
+    rows = cursor.fetchall()
+    # Station-side Haversine terms are computed once per snapshot, not per query
+    stations = (rows, *radian_terms(rows, 3, 4))
+    _local.stations = (version, stations)
+    return stations
+
+def _station_dict(row: tuple) -> Dict[str, Any]:
+    """Result dict for a cached police_stations row"""
+    return {
+        'id': row[0], 'station_name': row[1], 'station_code': row[2], 'latitude': row[3],
+        'longitude': row[4], 'contact_number': row[5], 'jurisdiction_area': row[6]
+    }
 
 def estimate_arrival_time(distance_km: float, avg_speed_kmh: float = 45) -> int:
     """Estimate patrol unit arrival time in minutes"""
     return max(1, int((distance_km / avg_speed_kmh) * 60))
 
+def _case_timestamp() -> str:
+    """Current minute as YYYYMMDDHHMM, formatted once per minute per thread"""
+    minute = int(time.time() // 60)
+    cached = getattr(_local, "case_minute", None)
+    if cached is None or cached[0] != minute:
+        cached = _local.case_minute = (minute, datetime.fromtimestamp(minute * 60).strftime("%Y%m%d%H%M"))
+    return cached[1]
+
 def generate_case_number() -> str:
     """Generate a unique case number"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M")
-    random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"CASE-{timestamp}-{random_suffix}"
+    return f"CASE-{_case_timestamp()}-{secrets.token_hex(3).upper()}"
 
 
 # ============== TOOL FUNCTIONS FOR LLM ==============
@@ -53,14 +233,7 @@ def get_all_police_stations() -> Dict[str, Any]:
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, station_name, station_code, latitude, longitude, 
-                   contact_number, jurisdiction_area
-            FROM police_stations
-        """)
-        stations = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        stations = [_station_dict(row) for row in _load_stations(conn)[0]]
         
         return {
             "success": True,
@@ -79,17 +252,32 @@ def get_available_patrol_units() -> Dict[str, Any]:
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.id, p.unit_code, p.vehicle_number, p.unit_type, 
-                   p.officers_count, p.latitude, p.longitude,
-                   s.station_name, s.contact_number, s.jurisdiction_area
-            FROM patrol_units p
-            JOIN police_stations s ON p.station_id = s.id
-            WHERE p.status = 'available'
-        """)
-        units = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        
+        # Reuse this thread's last snapshot while the database is unchanged
+        version = db_version(conn)
+        cached = getattr(_local, "available", None)
+        if cached is not None and cached[0] == version:
+            rows = cached[1]
+        else:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # plain tuples, in the column order below
+            cursor.execute("""
+                SELECT p.id, p.unit_code, p.vehicle_number, p.unit_type, 
+                       p.officers_count, p.latitude, p.longitude,
+                       s.station_name, s.contact_number, s.jurisdiction_area
+                FROM patrol_units p
+                JOIN police_stations s ON p.station_id = s.id
+                WHERE p.status = 'available'
+                ORDER BY p.id
+            """)
+            rows = cursor.fetchall()
+            _local.available = (version, rows)
+        
+        units = []
+        for row in rows:
+            unit_dict = _unit_dict(row)
+            unit_dict['jurisdiction_area'] = row[9]
+            units.append(unit_dict)
         
         return {
             "success": True,
@@ -117,26 +305,18 @@ def get_nearby_police_stations(
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT id, station_name, station_code, latitude, longitude, 
-                   contact_number, jurisdiction_area
-            FROM police_stations
-        """)
-        stations = cursor.fetchall()
-        conn.close()
+        # Station metadata and coordinates come from the cached snapshot
+        rows, lats_rad, lons_rad, cos_lats = _load_stations(conn)
+        distances = haversine_from_radians(*origin_terms(user_lat, user_lon), lats_rad, lons_rad, cos_lats)
         
         nearby = []
-        for station in stations:
-            distance = calculate_distance(user_lat, user_lon, station['latitude'], station['longitude'])
-            if distance <= radius_km:
-                station_dict = dict(station)
-                station_dict['distance_km'] = round(distance, 2)
-                station_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
-                nearby.append(station_dict)
-        
-        nearby.sort(key=lambda x: x['distance_km'])
+        for i in within_radius(distances, radius_km):
+            distance = float(distances[i])
+            station_dict = _station_dict(rows[i])
+            station_dict['distance_km'] = round(distance, 2)
+            station_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
+            nearby.append(station_dict)
         
         return {
             "success": True,
@@ -170,34 +350,51 @@ def get_nearby_patrol_units(
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        query = """
-            SELECT p.id, p.unit_code, p.vehicle_number, p.unit_type, 
-                   p.officers_count, p.latitude, p.longitude,
-                   s.station_name, s.contact_number
-            FROM patrol_units p
-            JOIN police_stations s ON p.station_id = s.id
-            WHERE p.status = 'available'
-        """
-        params = []
+        # Only units inside the search box reach the Haversine step
+        box = bounding_box(user_lat, user_lon, radius_km)
+        if box:
+            query = """
+                SELECT p.id, p.unit_code, p.vehicle_number, p.unit_type, 
+                       p.officers_count, p.latitude, p.longitude,
+                       s.station_name, s.contact_number
+                FROM patrol_units_rtree r
+                JOIN patrol_units p ON p.id = r.id
+                JOIN police_stations s ON p.station_id = s.id
+                WHERE p.status = 'available'
+                  AND r.max_lat >= ? AND r.min_lat <= ?
+                  AND r.max_lon >= ? AND r.min_lon <= ?
+            """
+            params = list(box)
+        else:
+            query = """
+                SELECT p.id, p.unit_code, p.vehicle_number, p.unit_type, 
+                       p.officers_count, p.latitude, p.longitude,
+                       s.station_name, s.contact_number
+                FROM patrol_units p
+                JOIN police_stations s ON p.station_id = s.id
+                WHERE p.status = 'available'
+            """
+            params = []
         
         if unit_type:
             query += " AND p.unit_type = ?"
             params.append(unit_type)
+        # Equal distances keep id order whichever index the query uses
+        query += " ORDER BY p.id"
         
+        cursor.row_factory = None  # plain tuples, in the column order above
         cursor.execute(query, params)
         units = cursor.fetchall()
-        conn.close()
         
+        # One vectorized distance pass; dicts are built only for units in range
+        distances = haversine_array(user_lat, user_lon, *_unit_coords(units))
         nearby = []
-        for unit in units:
-            distance = calculate_distance(user_lat, user_lon, unit['latitude'], unit['longitude'])
-            if distance <= radius_km:
-                unit_dict = dict(unit)
-                unit_dict['distance_km'] = round(distance, 2)
-                unit_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
-                nearby.append(unit_dict)
-        
-        nearby.sort(key=lambda x: x['distance_km'])
+        for i in within_radius(distances, radius_km):
+            distance = float(distances[i])
+            unit_dict = _unit_dict(units[i])
+            unit_dict['distance_km'] = round(distance, 2)
+            unit_dict['estimated_arrival_minutes'] = estimate_arrival_time(distance)
+            nearby.append(unit_dict)
         
         return {
             "success": True,
@@ -208,6 +405,31 @@ def get_nearby_patrol_units(
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _dispatch_confirmation(dispatch_id: int, case_number: str, unit, user_lat: float, user_lon: float,
+                           distance: float, emergency_type: str, threat_level: str) -> Dict[str, Any]:
+    """Confirmation returned for one dispatched patrol unit"""
+    eta_minutes = estimate_arrival_time(distance)
+    return {
+        "success": True,
+        "dispatch_id": dispatch_id,
+        "case_number": case_number,
+        "patrol_unit": {
+            "id": unit['id'],
+            "unit_code": unit['unit_code'],
+            "vehicle_number": unit['vehicle_number'],
+            "unit_type": unit['unit_type'],
+            "officers_count": unit['officers_count'],
+            "station_name": unit['station_name'],
+            "contact": unit['contact_number']
+        },
+        "destination": {"latitude": user_lat, "longitude": user_lon},
+        "distance_km": round(distance, 2),
+        "estimated_arrival_minutes": eta_minutes,
+        "emergency_type": emergency_type,
+        "threat_level": threat_level,
+        "message": f"Police unit {unit['unit_code']} dispatched. ETA: {eta_minutes} minutes. Case #: {case_number}"
+    }
+
 def dispatch_patrol_unit(
     patrol_unit_id: int,
     user_lat: float,
@@ -232,68 +454,71 @@ def dispatch_patrol_unit(
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get patrol unit info
-        cursor.execute("""
-            SELECT p.*, s.station_name, s.contact_number
-            FROM patrol_units p
-            JOIN police_stations s ON p.station_id = s.id
-            WHERE p.id = ?
-        """, (patrol_unit_id,))
-        unit = cursor.fetchone()
-        
-        if not unit:
-            conn.close()
-            return {"success": False, "error": "Patrol unit not found"}
-        
-        if unit['status'] != 'available':
-            conn.close()
-            return {"success": False, "error": f"Patrol unit is currently {unit['status']}"}
-        
-        distance = calculate_distance(user_lat, user_lon, unit['latitude'], unit['longitude'])
-        eta_minutes = estimate_arrival_time(distance)
-        
-        # Generate case number
-        case_number = generate_case_number()
-        
-        # Update unit status
-        cursor.execute("UPDATE patrol_units SET status = 'dispatched' WHERE id = ?", (patrol_unit_id,))
-        
-        # Create dispatch record
-        cursor.execute("""
-            INSERT INTO police_dispatches 
-            (patrol_unit_id, user_location_lat, user_location_lon, emergency_type, threat_level, case_number, notes, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'dispatched')
-        """, (patrol_unit_id, user_lat, user_lon, emergency_type, threat_level, case_number, notes))
-        
-        dispatch_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Claim and record the dispatch in one transaction
+        with conn:
+            # The status guard makes the claim race-free, and RETURNING hands
+            # back everything the confirmation needs without a separate SELECT
+            unit = conn.execute("""
+                UPDATE patrol_units SET status = 'dispatched'
+                WHERE id = ? AND status = 'available'
+                  AND station_id IN (SELECT id FROM police_stations)
+                RETURNING id, unit_code, vehicle_number, unit_type, officers_count, latitude, longitude,
+                          (SELECT station_name FROM police_stations s WHERE s.id = station_id) AS station_name,
+                          (SELECT contact_number FROM police_stations s WHERE s.id = station_id) AS contact_number
+            """, (patrol_unit_id,)).fetchone()
+            
+            if unit is None:
+                # Only a failed claim pays for the lookup that explains it
+                current = conn.execute("""
+                    SELECT p.status
+                    FROM patrol_units p
+                    JOIN police_stations s ON p.station_id = s.id
+                    WHERE p.id = ?
+                """, (patrol_unit_id,)).fetchone()
+                if not current:
+                    return {"success": False, "error": "Patrol unit not found"}
+                return {"success": False, "error": f"Patrol unit is currently {current['status']}"}
+            
+            distance = calculate_distance(user_lat, user_lon, unit['latitude'], unit['longitude'])
+            
+            # Generate case number
+            case_number = generate_case_number()
+            
+            # Create dispatch record
+            dispatch_id = conn.execute("""
+                INSERT INTO police_dispatches 
+                (patrol_unit_id, user_location_lat, user_location_lon, emergency_type, threat_level, case_number, notes, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'dispatched')
+            """, (patrol_unit_id, user_lat, user_lon, emergency_type, threat_level, case_number, notes)).lastrowid
         
-        return {
-            "success": True,
-            "dispatch_id": dispatch_id,
-            "case_number": case_number,
-            "patrol_unit": {
-                "id": unit['id'],
-                "unit_code": unit['unit_code'],
-                "vehicle_number": unit['vehicle_number'],
-                "unit_type": unit['unit_type'],
-                "officers_count": unit['officers_count'],
-                "station_name": unit['station_name'],
-                "contact": unit['contact_number']
-            },
-            "destination": {"latitude": user_lat, "longitude": user_lon},
-            "distance_km": round(distance, 2),
-            "estimated_arrival_minutes": eta_minutes,
-            "emergency_type": emergency_type,
-            "threat_level": threat_level,
-            "message": f"Police unit {unit['unit_code']} dispatched. ETA: {eta_minutes} minutes. Case #: {case_number}"
-        }
+        return _dispatch_confirmation(dispatch_id, case_number, unit, user_lat, user_lon, distance,
+                                      emergency_type, threat_level)
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+def _nearest_available_unit(conn, user_lat: float, user_lon: float, unit_type: Optional[str] = None):
+    """
+    Nearest available patrol unit within NEAREST_UNIT_RADIUS_KM, found in SQL
+    so only the winning row comes back (None if there is none)
+    """
+    box = bounding_box(user_lat, user_lon, NEAREST_UNIT_RADIUS_KM)
+    in_box = """
+        AND p.id IN (SELECT id FROM patrol_units_rtree
+                     WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)
+    """ if box else ""
+    
+    return conn.execute(f"""
+        SELECT p.id, haversine_km(?, ?, p.latitude, p.longitude) AS distance_km
+        FROM patrol_units p
+        JOIN police_stations s ON p.station_id = s.id
+        WHERE p.status = 'available'
+          AND (? IS NULL OR p.unit_type = ?)
+          {in_box}
+          AND distance_km <= ?
+        ORDER BY distance_km, p.id
+        LIMIT 1
+    """, (user_lat, user_lon, unit_type, unit_type, *(box or ()), NEAREST_UNIT_RADIUS_KM)).fetchone()
+
 def dispatch_nearest_patrol_unit(
     user_lat: float,
     user_lon: float,
@@ -316,26 +541,24 @@ def dispatch_nearest_patrol_unit(
     Returns:
         Dict containing dispatch confirmation
     """
-    unit_type = "rapid_response" if require_rapid_response else None
-    
-    result = get_nearby_patrol_units(user_lat, user_lon, radius_km=20, unit_type=unit_type)
-    
-    if not result["success"]:
-        return result
-    
-    # If rapid response not found but required, fall back to any unit
-    if result["count"] == 0 and require_rapid_response:
-        result = get_nearby_patrol_units(user_lat, user_lon, radius_km=20)
+    try:
+        conn = get_db_connection()
+        unit_type = "rapid_response" if require_rapid_response else None
+        nearest_unit = _nearest_available_unit(conn, user_lat, user_lon, unit_type)
+        
+        # If rapid response not found but required, fall back to any unit
+        if nearest_unit is None and require_rapid_response:
+            nearest_unit = _nearest_available_unit(conn, user_lat, user_lon)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
     
-    if result["count"] == 0:
+    if nearest_unit is None:
         return {
             "success": False,
             "error": "No available patrol units found nearby",
             "suggestion": "Call emergency services directly at 100"
         }
     
-    nearest_unit = result["patrol_units"][0]
-    
     return dispatch_patrol_unit(
         patrol_unit_id=nearest_unit["id"],
         user_lat=user_lat,
@@ -370,27 +593,54 @@ def dispatch_multiple_units(
     dispatched = []
     failed = []
     
-    result = get_nearby_patrol_units(user_lat, user_lon, radius_km=30)
-    
-    if not result["success"]:
-        return result
-    
-    available_units = result["patrol_units"]
-    
-    for i, unit in enumerate(available_units[:units_needed]):
-        dispatch_result = dispatch_patrol_unit(
-            patrol_unit_id=unit["id"],
-            user_lat=user_lat,
-            user_lon=user_lon,
-            emergency_type=emergency_type,
-            threat_level=threat_level,
-            notes=f"Multi-unit dispatch #{i+1}. {notes or ''}"
-        )
+    try:
+        conn = get_db_connection()
+        box = bounding_box(user_lat, user_lon, MULTI_UNIT_RADIUS_KM)
+        in_box = """
+            AND p.id IN (SELECT id FROM patrol_units_rtree
+                         WHERE max_lat >= ? AND min_lat <= ? AND max_lon >= ? AND min_lon <= ?)
+        """ if box else ""
         
-        if dispatch_result["success"]:
-            dispatched.append(dispatch_result)
-        else:
-            failed.append({"unit_id": unit["id"], "error": dispatch_result["error"]})
+        # Pick, claim and record every unit in one transaction
+        with conn:
+            units = conn.execute(f"""
+                SELECT p.id, p.unit_code, p.vehicle_number, p.unit_type, p.officers_count,
+                       s.station_name, s.contact_number,
+                       haversine_km(?, ?, p.latitude, p.longitude) AS distance_km
+                FROM patrol_units p
+                JOIN police_stations s ON p.station_id = s.id
+                WHERE p.status = 'available'
+                  {in_box}
+                  AND distance_km <= ?
+                ORDER BY distance_km, p.id
+                LIMIT ?
+            """, (user_lat, user_lon, *(box or ()), MULTI_UNIT_RADIUS_KM, max(units_needed, 0))).fetchall()
+            
+            if units:
+                # The status guard skips any unit a concurrent dispatch took first
+                placeholders = ",".join("?" * len(units))
+                claimed = {row[0] for row in conn.execute(f"""
+                    UPDATE patrol_units SET status = 'dispatched'
+                    WHERE id IN ({placeholders}) AND status = 'available'
+                    RETURNING id
+                """, [unit['id'] for unit in units]).fetchall()}
+            
+            for i, unit in enumerate(units):
+                if unit['id'] not in claimed:
+                    failed.append({"unit_id": unit['id'], "error": "Patrol unit is currently dispatched"})
+                    continue
+                
+                case_number = generate_case_number()
+                dispatch_id = conn.execute("""
+                    INSERT INTO police_dispatches 
+                    (patrol_unit_id, user_location_lat, user_location_lon, emergency_type, threat_level, case_number, notes, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 'dispatched')
+                """, (unit['id'], user_lat, user_lon, emergency_type, threat_level, case_number,
+                      f"Multi-unit dispatch #{i+1}. {notes or ''}")).lastrowid
+                dispatched.append(_dispatch_confirmation(dispatch_id, case_number, unit, user_lat, user_lon,
+                                                         unit['distance_km'], emergency_type, threat_level))
+    except Exception as e:
+        return {"success": False, "error": str(e)}
     
     return {
         "success": len(dispatched) > 0,
@@ -423,19 +673,18 @@ def create_case(
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        with conn:
+            cursor = conn.cursor()
         
-        case_number = generate_case_number()
+            case_number = generate_case_number()
         
-        cursor.execute("""
-            INSERT INTO cases 
-            (case_number, case_type, reported_lat, reported_lon, description, victim_safe, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'open')
-        """, (case_number, case_type, location_lat, location_lon, description, 1 if victim_safe else 0))
+            cursor.execute("""
+                INSERT INTO cases 
+                (case_number, case_type, reported_lat, reported_lon, description, victim_safe, status)
+                VALUES (?, ?, ?, ?, ?, ?, 'open')
+            """, (case_number, case_type, location_lat, location_lon, description, 1 if victim_safe else 0))
         
-        case_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            case_id = cursor.lastrowid
         
         return {
             "success": True,
@@ -471,20 +720,17 @@ def update_case_status(
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE cases 
-            SET status = ?, updated_at = CURRENT_TIMESTAMP, description = COALESCE(description || ' | ' || ?, description)
-            WHERE case_number = ?
-        """, (new_status, notes, case_number))
+        with conn:
+            cursor = conn.cursor()
         
-        if cursor.rowcount == 0:
-            conn.close()
-            return {"success": False, "error": "Case not found"}
+            cursor.execute("""
+                UPDATE cases 
+                SET status = ?, updated_at = CURRENT_TIMESTAMP, description = COALESCE(description || ' | ' || ?, description)
+                WHERE case_number = ?
+            """, (new_status, notes, case_number))
         
-        conn.commit()
-        conn.close()
+            if cursor.rowcount == 0:
+                return {"success": False, "error": "Case not found"}
         
         return {
             "success": True,
@@ -513,16 +759,13 @@ def update_patrol_unit_status(patrol_unit_id: int, new_status: str) -> Dict[str,
     
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("UPDATE patrol_units SET status = ? WHERE id = ?", (new_status, patrol_unit_id))
+        with conn:
+            cursor = conn.cursor()
         
-        if cursor.rowcount == 0:
-            conn.close()
-            return {"success": False, "error": "Patrol unit not found"}
+            cursor.execute("UPDATE patrol_units SET status = ? WHERE id = ?", (new_status, patrol_unit_id))
         
-        conn.commit()
-        conn.close()
+            if cursor.rowcount == 0:
+                return {"success": False, "error": "Patrol unit not found"}
         
         return {
             "success": True,
@@ -547,29 +790,23 @@ def complete_police_dispatch(dispatch_id: int, victim_safe: bool = True, notes:
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM police_dispatches WHERE id = ?", (dispatch_id,))
-        dispatch = cursor.fetchone()
-        
-        if not dispatch:
-            conn.close()
-            return {"success": False, "error": "Dispatch not found"}
-        
-        # Update dispatch status
-        cursor.execute("""
-            UPDATE police_dispatches 
-            SET status = 'resolved', resolved_time = CURRENT_TIMESTAMP, notes = ?
-            WHERE id = ?
-        """, (notes, dispatch_id))
-        
-        # Make patrol unit available
-        cursor.execute("""
-            UPDATE patrol_units SET status = 'available' WHERE id = ?
-        """, (dispatch['patrol_unit_id'],))
-        
-        conn.commit()
-        conn.close()
+        # Resolve the dispatch and free the unit in one transaction
+        with conn:
+            # Update dispatch status; RETURNING doubles as the existence check
+            dispatch = conn.execute("""
+                UPDATE police_dispatches 
+                SET status = 'resolved', resolved_time = CURRENT_TIMESTAMP, notes = ?
+                WHERE id = ?
+                RETURNING patrol_unit_id, case_number
+            """, (notes, dispatch_id)).fetchone()
+            
+            if not dispatch:
+                return {"success": False, "error": "Dispatch not found"}
+            
+            # Make patrol unit available
+            conn.execute("""
+                UPDATE patrol_units SET status = 'available' WHERE id = ?
+            """, (dispatch['patrol_unit_id'],))
         
         return {
             "success": True,
@@ -605,77 +842,20 @@ def assess_threat_level(
     Returns:
         Dict containing threat assessment and recommendations
     """
-    threat_score = 0
-    
-    # Emergency type base scores
-    type_scores = {
-        'kidnap': 4,
-        'extortion': 2,
-        'robbery': 3,
-        'assault': 3,
-        'threat': 1,
-        'suspicious_activity': 1
-    }
-    threat_score += type_scores.get(emergency_type.lower(), 2)
-    
-    # Factors
-    if weapons_involved:
-        threat_score += 4
-    if hostage_situation:
-        threat_score += 5
-    if suspect_present:
-        threat_score += 2
-    if violence_occurred:
-        threat_score += 3
-    if suspect_count > 2:
-        threat_score += 2
-    if victim_count > 1:
-        threat_score += 1
+    # Score each factor with table lookups instead of an if-chain
+    threat_score = (
+        THREAT_TYPE_SCORES.get(emergency_type.lower(), 2)
+        + (4 if weapons_involved else 0)
+        + (5 if hostage_situation else 0)
+        + (2 if suspect_present else 0)
+        + (3 if violence_occurred else 0)
+        + (2 if suspect_count > 2 else 0)
+        + (1 if victim_count > 1 else 0)
+    )
     
     # Determine threat level
-    if threat_score >= 10:
-        threat_level = "CRITICAL"
-        units_recommended = 4
-        require_rapid_response = True
-        recommendation = "Armed response team required. Multiple units needed immediately."
-        user_instructions = [
-            "DO NOT confront the suspects",
-            "Find a safe hiding place if possible",
-            "Stay silent and do not draw attention",
-            "Keep phone on silent but stay connected",
-            "Wait for police to arrive"
-        ]
-    elif threat_score >= 7:
-        threat_level = "HIGH"
-        units_recommended = 2
-        require_rapid_response = True
-        recommendation = "Rapid response unit recommended. Priority dispatch."
-        user_instructions = [
-            "Move to a safe location if possible",
-            "Stay calm and do not provoke",
-            "Note descriptions of suspects if safe to do so",
-            "Keep communication open with emergency services"
-        ]
-    elif threat_score >= 4:
-        threat_level = "MEDIUM"
-        units_recommended = 1
-        require_rapid_response = False
-        recommendation = "Standard patrol response. Exercise caution."
-        user_instructions = [
-            "Stay alert and aware of surroundings",
-            "Move to a well-lit, public area if possible",
-            "Wait for police to arrive"
-        ]
-    else:
-        threat_level = "LOW"
-        units_recommended = 1
-        require_rapid_response = False
-        recommendation = "Standard patrol response appropriate."
-        user_instructions = [
-            "Stay calm and observe",
-            "Note any useful details",
-            "Wait for police to arrive"
-        ]
+    (threat_level, units_recommended, require_rapid_response,
+     recommendation, user_instructions) = THREAT_LEVEL_BY_SCORE[min(threat_score, 10)]
     
     return {
         "success": True,
@@ -708,91 +888,10 @@ def get_safety_instructions(emergency_type: str) -> Dict[str, Any]:
     Returns:
         Dict containing safety instructions
     """
-    instructions = {
-        "kidnap": {
-            "immediate": [
-                "If you can communicate safely, share your location",
-                "Try to stay calm and do not resist violently",
-                "Observe and remember details about captors and location",
-                "Look for opportunities to escape only if safe",
-                "If possible, leave small clues for rescuers"
-            ],
-            "for_family": [
-                "Contact police immediately",
-                "Do not pay ransom without police guidance",
-                "Keep communication lines open",
-                "Document all communications from kidnappers"
-            ]
-        },
-        "extortion": {
-            "immediate": [
-                "Do not make immediate payments",
-                "Document all threats and communications",
-                "Report to police before responding to demands",
-                "Do not delete any messages or evidence",
-                "Inform trusted family members or friends"
-            ],
-            "ongoing": [
-                "Keep police informed of all developments",
-                "Follow police guidance on responses",
-                "Maintain records of all incidents"
-            ]
-        },
-        "robbery": {
-            "during": [
-                "Do not resist - your safety is priority",
-                "Follow instructions calmly",
-                "Avoid sudden movements",
-                "Do not make eye contact with weapons",
-                "Note physical descriptions if possible"
-            ],
-            "after": [
-                "Call police immediately",
-                "Do not touch anything at the scene",
-                "Note direction suspects fled",
-                "Get witness contact information"
-            ]
-        },
-        "assault": {
-            "during": [
-                "Try to escape to safety if possible",
-                "Protect vital areas (head, neck)",
-                "Call for help loudly",
-                "Fight back only as last resort"
-            ],
-            "after": [
-                "Get to a safe location",
-                "Call emergency services",
-                "Seek medical attention",
-                "Do not wash or change clothes (evidence)"
-            ]
-        },
-        "threat": {
-            "immediate": [
-                "Move to a safe, public location if possible",
-                "Do not engage with the person making threats",
-                "Try to note their appearance and any vehicle details",
-                "Contact trusted friends or family"
-            ],
-            "ongoing": [
-                "Document all threats (save messages, record times)",
-                "Report to police immediately",
-                "Consider changing your routine temporarily",
-                "Stay in well-lit, populated areas"
-            ]
-        }
-    }
-    
     return {
         "success": True,
         "emergency_type": emergency_type,
-        "instructions": instructions.get(emergency_type.lower(), {
-            "general": [
-                "Contact emergency services immediately",
-                "Move to a safe location",
-                "Stay calm and follow police instructions"
-            ]
-        })
+        "instructions": POLICE_SAFETY_INSTRUCTIONS.get(emergency_type.lower(), GENERAL_SAFETY_INSTRUCTIONS)
     }
 
 
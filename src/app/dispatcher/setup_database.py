@@ -5,7 +5,8 @@ Creates and initializes SQLite databases for ambulance, fire, and police service
 
 import sqlite3
 import os
-import random
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 
 DATABASE_PATH = os.path.join(os.path.dirname(__file__), "../../../database")
 
@@ -15,16 +16,26 @@ def get_db_connection(db_name: str):
     os.makedirs(DATABASE_PATH, exist_ok=True)
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    # Setup rebuilds the sample data from scratch on every run, so it does not need fsyncs
+    conn.execute("PRAGMA synchronous=OFF")
     return conn
 
-def setup_ambulance_db():
+def _insert_rows(cursor, insert: str, rows: list):
+    """Insert all rows with a single multi-row VALUES statement"""
+    placeholders = "(" + ", ".join("?" * len(rows[0])) + ")"
+    cursor.execute(f"{insert} VALUES {', '.join([placeholders] * len(rows))}", list(chain.from_iterable(rows)))
+
+def _build_ambulance_db():
     """Create and populate the ambulance database"""
     conn = get_db_connection("ambulance")
     cursor = conn.cursor()
+    # Drop, create and seed in one transaction with a single commit at the end
+    cursor.execute("BEGIN")
     
     # Drop existing tables to reset IDs
     cursor.execute("DROP TABLE IF EXISTS ambulance_dispatches")
     cursor.execute("DROP TABLE IF EXISTS ambulances")
+    cursor.execute("DROP TABLE IF EXISTS ambulance_rtree")
     
     # Create ambulances table
     cursor.execute("""
@@ -70,24 +81,54 @@ def setup_ambulance_db():
         ("KA-01-AM-1008", "Narayana Health", 12.9100, 77.6500, "available", "icu", "080-1008"),
     ]
     
-    cursor.executemany("""
-        INSERT INTO ambulances (vehicle_number, station_name, latitude, longitude, status, ambulance_type, contact_number)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, sample_ambulances)
+    # Nearby searches filter on status plus a lat/lon bounding box
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_amb_status_latlon ON ambulances(status, latitude, longitude)")
+    
+    # R-Tree over ambulance positions for nearest-ambulance lookups,
+    # kept in sync with the ambulances table by triggers
+    cursor.execute("""
+        CREATE VIRTUAL TABLE ambulance_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+    """)
+    cursor.execute("""
+        CREATE TRIGGER ambulances_rtree_insert AFTER INSERT ON ambulances BEGIN
+            INSERT INTO ambulance_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER ambulances_rtree_update AFTER UPDATE OF latitude, longitude ON ambulances BEGIN
+            UPDATE ambulance_rtree
+            SET min_lat = new.latitude, max_lat = new.latitude, min_lon = new.longitude, max_lon = new.longitude
+            WHERE id = new.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER ambulances_rtree_delete AFTER DELETE ON ambulances BEGIN
+            DELETE FROM ambulance_rtree WHERE id = old.id;
+        END
+    """)
+    
+    _insert_rows(cursor, "INSERT INTO ambulances (vehicle_number, station_name, latitude, longitude, status, ambulance_type, contact_number)", sample_ambulances)
     
     conn.commit()
     conn.close()
+
+def setup_ambulance_db():
+    """Create and populate the ambulance database, reporting when done"""
+    _build_ambulance_db()
     print("[OK] Ambulance database setup complete")
 
-def setup_fire_db():
+def _build_fire_db():
     """Create and populate the fire brigade database"""
     conn = get_db_connection("fire")
     cursor = conn.cursor()
+    # Drop, create and seed in one transaction with a single commit at the end
+    cursor.execute("BEGIN")
     
     # Drop existing tables to reset IDs
     cursor.execute("DROP TABLE IF EXISTS fire_dispatches")
     cursor.execute("DROP TABLE IF EXISTS fire_trucks")
     cursor.execute("DROP TABLE IF EXISTS fire_stations")
+    cursor.execute("DROP TABLE IF EXISTS fire_stations_rtree")
     
     # Create fire stations table
     cursor.execute("""
@@ -144,10 +185,35 @@ def setup_fire_db():
         ("Electronic City Fire Station", "FS-005", 12.8456, 77.6603, "101", 2, 2),
     ]
     
-    cursor.executemany("""
-        INSERT INTO fire_stations (station_name, station_code, latitude, longitude, contact_number, available_units, total_units)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, sample_stations)
+    # Nearby searches narrow stations (and trucks through their station) by a lat/lon box
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fs_latlon ON fire_stations(latitude, longitude)")
+    # Truck lookups only ever want available trucks, so only those are indexed
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_trucks_available ON fire_trucks(station_id) WHERE status = 'available'")
+    
+    # R-Tree over station positions for nearby station/truck lookups,
+    # kept in sync with the fire_stations table by triggers
+    cursor.execute("""
+        CREATE VIRTUAL TABLE fire_stations_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+    """)
+    cursor.execute("""
+        CREATE TRIGGER fire_stations_rtree_insert AFTER INSERT ON fire_stations BEGIN
+            INSERT INTO fire_stations_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER fire_stations_rtree_update AFTER UPDATE OF latitude, longitude ON fire_stations BEGIN
+            UPDATE fire_stations_rtree
+            SET min_lat = new.latitude, max_lat = new.latitude, min_lon = new.longitude, max_lon = new.longitude
+            WHERE id = new.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER fire_stations_rtree_delete AFTER DELETE ON fire_stations BEGIN
+            DELETE FROM fire_stations_rtree WHERE id = old.id;
+        END
+    """)
+    
+    _insert_rows(cursor, "INSERT INTO fire_stations (station_name, station_code, latitude, longitude, contact_number, available_units, total_units)", sample_stations)
     
     # Sample fire trucks
     sample_trucks = [
@@ -163,25 +229,30 @@ def setup_fire_db():
         ("KA-01-FT-502", 5, "rescue", "available", 2000),
     ]
     
-    cursor.executemany("""
-        INSERT INTO fire_trucks (vehicle_number, station_id, truck_type, status, water_capacity)
-        VALUES (?, ?, ?, ?, ?)
-    """, sample_trucks)
+    _insert_rows(cursor, "INSERT INTO fire_trucks (vehicle_number, station_id, truck_type, status, water_capacity)", sample_trucks)
     
     conn.commit()
     conn.close()
+
+def setup_fire_db():
+    """Create and populate the fire brigade database, reporting when done"""
+    _build_fire_db()
     print("[OK] Fire brigade database setup complete")
 
-def setup_police_db():
+def _build_police_db():
     """Create and populate the police database"""
     conn = get_db_connection("police")
     cursor = conn.cursor()
+    # Drop, create and seed in one transaction with a single commit at the end
+    cursor.execute("BEGIN")
     
     # Drop existing tables to reset IDs
     cursor.execute("DROP TABLE IF EXISTS police_dispatches")
     cursor.execute("DROP TABLE IF EXISTS cases")
     cursor.execute("DROP TABLE IF EXISTS patrol_units")
     cursor.execute("DROP TABLE IF EXISTS police_stations")
+    cursor.execute("DROP TABLE IF EXISTS police_stations_rtree")
+    cursor.execute("DROP TABLE IF EXISTS patrol_units_rtree")
     
     # Create police stations table
     cursor.execute("""
@@ -247,6 +318,34 @@ def setup_police_db():
         )
     """)
     
+    # Unit lookups only ever want available units, optionally of one type
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_units_available ON patrol_units(unit_type, station_id) WHERE status = 'available'")
+    
+    # R-Tree over patrol unit positions for nearby lookups, kept in sync by
+    # triggers; units without a position are left out
+    cursor.execute("""
+        CREATE VIRTUAL TABLE patrol_units_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)
+    """)
+    cursor.execute("""
+        CREATE TRIGGER patrol_units_rtree_insert AFTER INSERT ON patrol_units
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+            INSERT INTO patrol_units_rtree VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER patrol_units_rtree_update AFTER UPDATE OF latitude, longitude ON patrol_units BEGIN
+            DELETE FROM patrol_units_rtree WHERE id = old.id;
+            INSERT INTO patrol_units_rtree
+            SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER patrol_units_rtree_delete AFTER DELETE ON patrol_units BEGIN
+            DELETE FROM patrol_units_rtree WHERE id = old.id;
+        END
+    """)
+    
     # Sample police stations
     sample_stations = [
         ("Cubbon Park Police Station", "PS-001", 12.9763, 77.5929, "100", "Central Bangalore"),
@@ -257,10 +356,7 @@ def setup_police_db():
         ("HSR Layout Police Station", "PS-006", 12.9116, 77.6389, "100", "HSR Layout"),
     ]
     
-    cursor.executemany("""
-        INSERT INTO police_stations (station_name, station_code, latitude, longitude, contact_number, jurisdiction_area)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, sample_stations)
+    _insert_rows(cursor, "INSERT INTO police_stations (station_name, station_code, latitude, longitude, contact_number, jurisdiction_area)", sample_stations)
     
     # Sample patrol units with varying locations
     sample_units = [
@@ -274,21 +370,31 @@ def setup_police_db():
         ("PATROL-008", 6, "KA-01-PC-008", "patrol", "available", 2, 12.9100, 77.6400),
     ]
     
-    cursor.executemany("""
-        INSERT INTO patrol_units (unit_code, station_id, vehicle_number, unit_type, status, officers_count, latitude, longitude)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, sample_units)
+    _insert_rows(cursor, "INSERT INTO patrol_units (unit_code, station_id, vehicle_number, unit_type, status, officers_count, latitude, longitude)", sample_units)
     
     conn.commit()
     conn.close()
+
+def setup_police_db():
+    """Create and populate the police database, reporting when done"""
+    _build_police_db()
     print("[OK] Police database setup complete")
 
 def setup_all_databases():
     """Setup all emergency service databases"""
     print("\nSetting up Emergency Services Databases...\n")
-    setup_ambulance_db()
-    setup_fire_db()
-    setup_police_db()
+    # Each service has its own database file, so they can be built concurrently;
+    # status lines are printed here, in a fixed order, once each build finishes
+    builds = (
+        (_build_ambulance_db, "Ambulance"),
+        (_build_fire_db, "Fire brigade"),
+        (_build_police_db, "Police"),
+    )
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [(executor.submit(build), label) for build, label in builds]
+        for future, label in futures:
+            future.result()
+            print(f"[OK] {label} database setup complete")
     print("\nAll databases setup complete!\n")
 
 if __name__ == "__main__":
@@ -30,9 +30,13 @@ from dispatcher.state_tools import STATE_TOOLS
 from dispatcher import AMBULANCE_TOOLS, FIRE_TOOLS, POLICE_TOOLS
 
 
+# Tool schemas are static, so the combined list is built once at import
+_ALL_TOOLS = STATE_TOOLS + AMBULANCE_TOOLS + FIRE_TOOLS + POLICE_TOOLS
+
+
 def get_all_tools() -> List[Dict[str, Any]]:
-    """Get all available tools for the LLM"""
-    return STATE_TOOLS + AMBULANCE_TOOLS + FIRE_TOOLS + POLICE_TOOLS
+    """Get all available tools for the LLM (shared list; do not modify)"""
+    return _ALL_TOOLS
 
 
 class EmergencyOrchestrator:
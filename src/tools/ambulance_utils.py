@@ -1,138 +1,228 @@
 # tools/ambulance_db.py
 import sqlite3
-from math import radians, cos, sin, sqrt, atan2
+import threading
+from math import radians, degrees, cos, sin, sqrt, asin
+import numpy as np
+
+try:
+    from numba import njit, prange  # optional: JIT-compiled distance kernel
+except ImportError:
+    njit = None
+
+# One connection shared by every tool call; _LOCK serializes access to it
+_CONN = None
+_LOCK = threading.Lock()
+
+def get_conn():
+    # Callers must hold _LOCK
+    global _CONN
+    if _CONN is None:
+        _CONN = sqlite3.connect("ambulance.db", check_same_thread=False)
+        _CONN.execute("PRAGMA journal_mode=WAL")
+        _CONN.execute("PRAGMA synchronous=NORMAL")
+        _CONN.execute("PRAGMA temp_store=MEMORY")
+        _CONN.execute("PRAGMA mmap_size=268435456")
+    return _CONN
 
 def haversine(lat1, lon1, lat2, lon2):
     # Calculate the distance between 2 lat/lon points (km)
     R = 6371.0
     dlat = radians(lat2 - lat1)
     dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    sin_lat = sin(dlat / 2)
+    sin_lon = sin(dlon / 2)
+    a = sin_lat*sin_lat + cos(radians(lat1)) * cos(radians(lat2)) * sin_lon*sin_lon
+    c = 2 * asin(sqrt(a))
     return R * c
 
-def get_nearby_ambulances(user_lat, user_lon, max_distance_km=10000.0):
+def _haversine_numpy(lat, lon, user_lat, user_lon):
+    R = 6371.0
+    lat1 = np.radians(user_lat)
+    lat2 = np.radians(lat)
+    dlat = lat2 - lat1
+    dlon = np.radians(lon - user_lon)
+    sin_lat = np.sin(dlat / 2)
+    sin_lon = np.sin(dlon / 2)
+    a = sin_lat*sin_lat + np.cos(lat1) * np.cos(lat2) * sin_lon*sin_lon
+    return 2 * R * np.arcsin(np.sqrt(a))
+
+if njit is not None:
+    @njit(fastmath=True, parallel=True, cache=True)
+    def _haversine_numba(lat, lon, user_lat, user_lon):
+        R = 6371.0
+        lat1 = np.radians(user_lat)
+        out = np.empty(lat.shape[0])
+        for i in prange(lat.shape[0]):
+            lat2 = np.radians(lat[i])
+            dlat = lat2 - lat1
+            dlon = np.radians(lon[i] - user_lon)
+            sin_lat = np.sin(dlat / 2)
+            sin_lon = np.sin(dlon / 2)
+            a = sin_lat*sin_lat + np.cos(lat1) * np.cos(lat2) * sin_lon*sin_lon
+            out[i] = 2 * R * np.arcsin(np.sqrt(a))
+        return out
+
+    haversine_array = _haversine_numba
+    # Compile (or load from cache) at import rather than on the first emergency
+    haversine_array(np.zeros(4), np.zeros(4), 0.0, 0.0)
+else:
+    haversine_array = _haversine_numpy
+
+def bounding_box(lat, lon, distance_km):
+    # Lat/lon box that contains every point within distance_km of (lat, lon),
+    # or None if the circle reaches a pole, wraps around the globe or crosses
+    # the antimeridian
+    R = 6371.0
+    angular = distance_km / R
+    min_lat = lat - degrees(angular)
+    max_lat = lat + degrees(angular)
+    if min_lat <= -90 or max_lat >= 90:
+        return None
+    ratio = sin(angular) / cos(radians(lat))
+    if angular >= radians(90) or ratio >= 1:
+        return None
+    dlon = degrees(asin(ratio))
+    if lon - dlon < -180 or lon + dlon > 180:
+        return None
+    return min_lat, max_lat, lon - dlon, lon + dlon
 
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
+def get_nearby_ambulances(user_lat, user_lon, max_distance_km=10000.0):
 
-    c.execute("SELECT id, driver_name, latitude, longitude FROM ambulances WHERE is_available = 1")
-    rows = c.fetchall()
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
+
+        rows = None
+        box = bounding_box(user_lat, user_lon, max_distance_km)
+        if box is not None:
+            # Narrow candidates with the R-Tree before computing exact distances
+            try:
+                c.execute("""
+                    SELECT a.id, a.driver_name, a.latitude, a.longitude
+                    FROM ambulance_rtree r JOIN ambulances a ON a.id = r.id
+                    WHERE a.is_available = 1
+                      AND r.max_lat >= ? AND r.min_lat <= ?
+                      AND r.max_lon >= ? AND r.min_lon <= ?
+                """, box)
+                rows = c.fetchall()
+            except sqlite3.OperationalError:
+                # Database created before the R-Tree existed
+                rows = None
+
+        if rows is None:
+            c.execute("SELECT id, driver_name, latitude, longitude FROM ambulances WHERE is_available = 1")
+            rows = c.fetchall()
 
     if not rows:
         print("[DEBUG] No available ambulances found in DB.")
-    
+
     nearby = []
     seen_drivers = set()
-    for row in rows:
-        amb_id, driver_name, lat, lon = row
-        dist = haversine(user_lat, user_lon, lat, lon)
+    # Distances for every candidate in one vectorized call
+    lats = np.fromiter((row[2] for row in rows), np.float64, len(rows))
+    lons = np.fromiter((row[3] for row in rows), np.float64, len(rows))
+    dists = haversine_array(lats, lons, float(user_lat), float(user_lon))
+    for i in np.flatnonzero(dists <= max_distance_km):
+        amb_id, driver_name, lat, lon = rows[i]
+        dist = float(dists[i])
         print(f"[DEBUG] Amb: {amb_id}, Dist: {dist}")
 
-        if dist is None:
-            continue
-
-        if dist <= max_distance_km:
-            driver_key = (driver_name, round(dist, 2))
-            if driver_key not in seen_drivers:
-                seen_drivers.add(driver_key)
-                nearby.append({
-                    "id": amb_id,
-                    "driver": driver_name,
-                    "lat": lat,
-                    "lon": lon,
-                    "distance_km": round(dist, 2)
-                })
-
-    conn.close()
+        driver_key = (driver_name, round(dist, 2))
+        if driver_key not in seen_drivers:
+            seen_drivers.add(driver_key)
+            nearby.append({
+                "id": amb_id,
+                "driver": driver_name,
+                "lat": lat,
+                "lon": lon,
+                "distance_km": round(dist, 2)
+            })
+
     print(f"[DEBUG] Nearby ambulances found: {len(nearby)}")
     return sorted(nearby, key=lambda x: x["distance_km"])
 
 
 def book_ambulance(user_lat, user_lon, ambulance_id):
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
-
-    try:
-        # Check if ambulance exists and is available
-        c.execute("SELECT is_available FROM ambulances WHERE id = ?", (ambulance_id,))
-        result = c.fetchone()
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
+
+        try:
+            # Check if ambulance exists and is available
+            c.execute("SELECT is_available FROM ambulances WHERE id = ?", (ambulance_id,))
+            result = c.fetchone()
         
-        if not result:
-            conn.close()
-            raise ValueError(f"Ambulance with ID {ambulance_id} not found")
+            if not result:
+                raise ValueError(f"Ambulance with ID {ambulance_id} not found")
         
-        if not result[0]:
-            conn.close()
-            raise ValueError(f"Ambulance with ID {ambulance_id} is not available")
+            if not result[0]:
+                raise ValueError(f"Ambulance with ID {ambulance_id} is not available")
 
-        # Insert into bookings
-        c.execute("""
-            INSERT INTO bookings (user_latitude, user_longitude, ambulance_id, status)
-            VALUES (?, ?, ?, 'pending')
-        """, (user_lat, user_lon, ambulance_id))
+            # Insert into bookings
+            c.execute("""
+                INSERT INTO bookings (user_latitude, user_longitude, ambulance_id, status)
+                VALUES (?, ?, ?, 'pending')
+            """, (user_lat, user_lon, ambulance_id))
 
-        # Mark ambulance as unavailable
-        c.execute("UPDATE ambulances SET is_available = 0 WHERE id = ?", (ambulance_id,))
-        conn.commit()
+            # Mark ambulance as unavailable
+            c.execute("UPDATE ambulances SET is_available = 0 WHERE id = ?", (ambulance_id,))
+            conn.commit()
 
-        booking_id = c.lastrowid
-        conn.close()
-        return booking_id
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise e
+            booking_id = c.lastrowid
+            return booking_id
+        except Exception as e:
+            conn.rollback()
+            raise e
 
 def update_booking_status(booking_id, status):
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
-    c.execute("UPDATE bookings SET status = ? WHERE id = ?", (status, booking_id))
-    conn.commit()
-    conn.close()
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("UPDATE bookings SET status = ? WHERE id = ?", (status, booking_id))
+        conn.commit()
 
 def reset_all():
     """Reset ambulance availability, clear bookings, and reset booking IDs."""
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
 
-    # Set all ambulances to available
-    c.execute("UPDATE ambulances SET is_available = 1")
+        # Set all ambulances to available
+        c.execute("UPDATE ambulances SET is_available = 1")
 
-    # Delete all existing bookings
-    c.execute("DELETE FROM bookings")
+        # Delete all existing bookings
+        c.execute("DELETE FROM bookings")
 
-    # Reset the auto-increment counter for the bookings table
-    c.execute("DELETE FROM sqlite_sequence WHERE name='bookings'")
+        # Reset the auto-increment counter for the bookings table
+        c.execute("DELETE FROM sqlite_sequence WHERE name='bookings'")
 
-    conn.commit()
-    conn.close()
-    print("Reset completed: Ambulances available, bookings cleared, booking IDs reset.")
+        conn.commit()
+        print("Reset completed: Ambulances available, bookings cleared, booking IDs reset.")
 
 
 def get_booking_status(booking_id):
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
-    c.execute("SELECT status FROM bookings WHERE id = ?", (booking_id,))
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else None
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("SELECT status FROM bookings WHERE id = ?", (booking_id,))
+        row = c.fetchone()
+        return row[0] if row else None
 
 def cancel_booking(booking_id):
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
 
-    # Set status
-    c.execute("UPDATE bookings SET status = 'cancelled' WHERE id = ?", (booking_id,))
+        # Set status
+        c.execute("UPDATE bookings SET status = 'cancelled' WHERE id = ?", (booking_id,))
 
-    # Make ambulance available again
-    c.execute("""
-        UPDATE ambulances SET is_available = 1
-        WHERE id = (SELECT ambulance_id FROM bookings WHERE id = ?)
-    """, (booking_id,))
+        # Make ambulance available again
+        c.execute("""
+            UPDATE ambulances SET is_available = 1
+            WHERE id = (SELECT ambulance_id FROM bookings WHERE id = ?)
+        """, (booking_id,))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 def estimate_eta_km(speed_kmph, distance_km):
     if speed_kmph <= 0:
@@ -141,17 +231,17 @@ def estimate_eta_km(speed_kmph, distance_km):
     return round(time_hr * 60)  # return ETA in minutes
 
 def get_user_booking_history(limit=10):
-    conn = sqlite3.connect("ambulance.db")
-    c = conn.cursor()
-    c.execute("""
-        SELECT b.id, a.driver_name, b.status, b.user_latitude, b.user_longitude
-        FROM bookings b
-        JOIN ambulances a ON b.ambulance_id = a.id
-        ORDER BY b.id DESC LIMIT ?
-    """, (limit,))
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    with _LOCK:
+        conn = get_conn()
+        c = conn.cursor()
+        c.execute("""
+            SELECT b.id, a.driver_name, b.status, b.user_latitude, b.user_longitude
+            FROM bookings b
+            JOIN ambulances a ON b.ambulance_id = a.id
+            ORDER BY b.id DESC LIMIT ?
+        """, (limit,))
+        rows = c.fetchall()
+        return rows
 
 if __name__ == "__main__":
     # reset_all()